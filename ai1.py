@@ -1,11 +1,14 @@
 import os
 import requests
 import random
-import time
-import feedparser
-from datetime import datetime, timedelta
 import re
-import tweepy
+
+import history
+import llm
+import publisher
+from articles import Article, feed_source
+from feeds import fetch_feeds
+from keywords import KeywordMatcher
 
 # ================================
 # CONFIGURATION FROM ENVIRONMENT
@@ -15,6 +18,7 @@ TWITTER_API_SECRET = os.environ.get('TWITTER_API_SECRET')
 TWITTER_ACCESS_TOKEN = os.environ.get('TWITTER_ACCESS_TOKEN')
 TWITTER_ACCESS_TOKEN_SECRET = os.environ.get('TWITTER_ACCESS_TOKEN_SECRET')
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+GEMINI_MODEL = 'gemini-1.5-flash'
 
 # RSS Feeds for AI/ML content
 AI_RSS_FEEDS = [
@@ -35,24 +39,21 @@ PROMOTIONAL_TERMS = [
     'special offer', 'exclusive deal', 'sign up', 'subscribe',
     'free trial', 'contact sales', 'request demo', 'pricing'
 ]
+PROMOTIONAL_MATCHER = KeywordMatcher(PROMOTIONAL_TERMS)
 
 # ================================
 # SIMPLIFIED FILTERING FUNCTIONS
 # ================================
 def should_filter_article(article):
     """Check if article should be filtered out"""
-    combined_text = f"{article.get('title', '')} {article.get('summary', '')}".lower()
-    
     # Filter out promotional content
-    if any(term in combined_text for term in PROMOTIONAL_TERMS):
+    if PROMOTIONAL_MATCHER.search(article.title_lower, article.summary_lower):
         return True
     
     # Filter out old articles (older than 14 days)
-    pub_date = article.get('published')
-    if pub_date:
-        age_days = (datetime.now() - pub_date).days
-        if age_days > 14:
-            return True
+    age = article.age()
+    if age is not None and age >= 15 * 86400:
+        return True
     
     return False
 
@@ -71,37 +72,27 @@ def fetch_articles():
     """Fetch and filter articles from all RSS feeds"""
     all_articles = []
     
-    for feed_url in AI_RSS_FEEDS:
+    for feed_url, feed in fetch_feeds(AI_RSS_FEEDS):
         try:
-            feed = feedparser.parse(feed_url)
-            
             if not feed.entries:
                 continue
                 
             for entry in feed.entries[:5]:  # Limit entries per feed
-                pub_date = None
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    try:
-                        pub_date = datetime(*entry.published_parsed[:6])
-                    except:
-                        pass
-                
-                article = {
-                    'title': entry.title if hasattr(entry, 'title') else 'No title',
-                    'link': entry.link if hasattr(entry, 'link') else '#',
-                    'summary': entry.summary if hasattr(entry, 'summary') else '',
-                    'published': pub_date,
-                    'source': feed.feed.title if hasattr(feed.feed, 'title') else 'Unknown',
-                    'image_url': extract_image(entry)
-                }
+                article = Article.from_entry(
+                    entry,
+                    source=feed_source(feed, feed_url, 'Unknown'),
+                    title=entry.get('title', 'No title'),
+                    link=entry.get('link', '#'),
+                    image_finder=extract_image
+                )
                 all_articles.append(article)
-                
-            time.sleep(0.5)  # Be polite to servers
             
         except Exception as e:
             continue
     
-    return all_articles
+    # Skip stories we've already posted about
+    posted = history.posted_urls(article.link for article in all_articles)
+    return [article for article in all_articles if article.link not in posted]
 
 def extract_image(entry):
     """Extract image URL from feed entry"""
@@ -140,11 +131,11 @@ def extract_image(entry):
 # ================================
 def generate_tweet_content(article):
     """Generate tweet content using Gemini API"""
-    print(f"\n[DEBUG] Generating tweet for: {article['title'][:60]}...")
+    print(f"\n[DEBUG] Generating tweet for: {article.title[:60]}...")
     
     try:
         # Clean and prepare the summary
-        summary = article['summary']
+        summary = article.summary
         if len(summary) > 300:
             summary = summary[:300] + "..."
         
@@ -152,7 +143,7 @@ def generate_tweet_content(article):
         summary = re.sub(r'<[^>]+>', '', summary)
         
         prompt = f"""
-        Create a tweet about this AI topic: "{article['title']}"
+        Create a tweet about this AI topic: "{article.title}"
         
         Key points: {summary}
         
@@ -168,15 +159,13 @@ def generate_tweet_content(article):
         print(f"[DEBUG] Calling Gemini API...")
         
         # Try Gemini 1.5 Flash instead - more reliable endpoint
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1/models/gemini-1.5-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={
+        response = llm.request(
+            {
                 "contents": [{
                     "parts": [{"text": prompt}]
                 }]
             },
+            model=GEMINI_MODEL,
             timeout=30
         )
         
@@ -218,34 +207,10 @@ def generate_tweet_content(article):
 # ================================
 # TWITTER POSTING
 # ================================
-def post_to_twitter(content):
-    """Post content to Twitter using Tweepy"""
-    try:
-        print(f"\n[DEBUG] Posting to Twitter...")
-        
-        # Authenticate
-        auth = tweepy.OAuthHandler(TWITTER_API_KEY, TWITTER_API_SECRET)
-        auth.set_access_token(TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET)
-        
-        # Use API v1.1 for compatibility
-        api = tweepy.API(auth, wait_on_rate_limit=True)
-        
-        # Verify credentials
-        user = api.verify_credentials()
-        print(f"[DEBUG] Twitter auth successful: @{user.screen_name}")
-        
-        # Post tweet
-        tweet = api.update_status(content)
-        print(f"[DEBUG] Tweet posted: ID {tweet.id}")
-        
-        return True
-        
-    except tweepy.TweepyException as e:
-        print(f"[DEBUG] Twitter API error: {e}")
-        return False
-    except Exception as e:
-        print(f"[DEBUG] Posting error: {type(e).__name__}: {str(e)[:100]}")
-        return False
+def post_to_twitter(content, source_url=None):
+    """Queue content in the outbox and post it with a rendered quote card"""
+    print(f"\n[DEBUG] Posting to Twitter...")
+    return publisher.post('ai1', content, url=source_url, card_theme='ai1')
 
 # ================================
 # MAIN EXECUTION FLOW
@@ -274,6 +239,16 @@ def main():
     
     print("✅ All environment variables are set")
     
+    # Stop before fetching feeds or calling Gemini when the account's
+    # tweet quota is used up
+    if not publisher.can_post():
+        return
+    
+    # A post an earlier run queued but couldn't publish goes out before
+    # anything new is generated
+    if publisher.resume('ai1'):
+        return
+    
     # Fetch and filter articles
     print("\n📡 Fetching articles...")
     articles = fetch_articles()
@@ -294,7 +269,7 @@ def main():
     
     # Select random article
     selected_article = random.choice(filtered_articles)
-    print(f"\n🎯 Selected: {selected_article['title'][:80]}...")
+    print(f"\n🎯 Selected: {selected_article.title[:80]}...")
     
     # Generate tweet content
     tweet_content = generate_tweet_content(selected_article)
@@ -313,7 +288,7 @@ def main():
     print("-" * 50)
     
     # Post to Twitter
-    success = post_to_twitter(tweet_content)
+    success = post_to_twitter(tweet_content, selected_article.link)
     
     if success:
         print("\n🎉 Success!")
@@ -0,0 +1,170 @@
+import calendar
+import re
+import time
+
+import feedparser
+
+from dedupe import canonical_url
+
+# ================================
+# ARTICLE RECORD
+# ================================
+# Every bot reads feed entries into the same compact record. Text is
+# lowercased once here rather than in every filter, the publish time is a
+# UTC epoch timestamp, and the feedparser entry is not kept once its
+# fields are copied out.
+#
+# Only one or two articles per run are ever posted, so images are not
+# searched for while reading feeds. The entry fields that can hold images
+# are kept with the bot's image finder, which runs the first time
+# `images` or `image_url` is read. HTML fields are cut down to their <img>
+# tags so a filtered-out article doesn't hold the whole body.
+
+# Entry fields image finders look at
+IMAGE_FIELDS = ('links', 'media_content', 'media_thumbnail', 'enclosures', 'content', 'summary')
+
+IMG_TAG_RE = re.compile(r'<img[^>]*>', re.IGNORECASE)
+
+def _img_tags(html):
+    """Just the <img> tags of an HTML fragment"""
+    return ' '.join(IMG_TAG_RE.findall(html or ''))
+
+def _image_fields(entry):
+    """The entry fields image finders look at, with HTML reduced to <img> tags"""
+    fields = feedparser.FeedParserDict()
+    for name in IMAGE_FIELDS:
+        if name not in entry:
+            continue
+        value = entry[name]
+        if name == 'summary':
+            value = _img_tags(value)
+        elif name == 'content':
+            value = [feedparser.FeedParserDict(value=_img_tags(item.get('value'))) for item in value]
+        fields[name] = value
+    return fields
+
+class Article:
+    """One feed item, normalized when it is read"""
+
+    __slots__ = (
+        'title', 'link', 'summary', 'source', 'category', 'published',
+        'subreddit', '_images', '_image_fields', '_image_finder',
+        'title_lower', 'summary_lower', 'canonical_url',
+        'source_count', 'sources', 'links',
+    )
+
+    def __init__(self, title, link, summary='', source='', category=None,
+                 published=None, image_url=None, images=None, subreddit=None):
+        self.title = title or ''
+        self.link = link or ''
+        self.summary = summary or ''
+        self.source = source or ''
+        self.category = category
+        # UTC epoch seconds, or None when the feed gave no date
+        self.published = published
+        self.subreddit = subreddit
+        self._image_fields = None
+        self._image_finder = None
+        self._images = None
+        if images is not None:
+            self.images = images
+        elif image_url is not None:
+            self.image_url = image_url
+
+        self.title_lower = self.title.lower()
+        self.summary_lower = self.summary.lower()
+        self.canonical_url = canonical_url(self.link)
+
+        # Filled in by dedupe_articles when several outlets ran the story
+        self.source_count = 1
+        self.sources = [self.source]
+        self.links = [self.link]
+
+    @classmethod
+    def from_entry(cls, entry, source='', category=None, image_finder=None, **fields):
+        """
+        Article from a feedparser entry; keyword fields override the entry's.
+        `image_finder(entry)` returns an image URL or a list of them and is
+        only called if the article's images are asked for.
+        """
+        values = {
+            'title': entry.get('title', ''),
+            'link': entry.get('link', ''),
+            'summary': entry.get('summary', ''),
+            'published': entry_timestamp(entry),
+            'subreddit': entry.get('subreddit'),
+        }
+        values.update(fields)
+        article = cls(source=source, category=category, **values)
+        if image_finder and article._images is None:
+            article._image_finder = image_finder
+            article._image_fields = _image_fields(entry)
+        return article
+
+    @property
+    def images(self):
+        """Image URLs of the article, looked up on first use"""
+        if self._images is None:
+            found = None
+            if self._image_finder:
+                try:
+                    found = self._image_finder(self._image_fields)
+                except Exception as e:
+                    print(f"⚠️ Error extracting image: {e}")
+            if isinstance(found, str):
+                found = [found]
+            self._images = list(found or [])
+            self._image_fields = self._image_finder = None
+        return self._images
+
+    @images.setter
+    def images(self, urls):
+        self._images = list(urls or [])
+        self._image_fields = self._image_finder = None
+
+    @property
+    def image_url(self):
+        """First image URL, or None"""
+        images = self.images
+        return images[0] if images else None
+
+    @image_url.setter
+    def image_url(self, url):
+        self.images = [url] if url else []
+
+    def age(self, now=None):
+        """Seconds since the article was published, or None if undated"""
+        if self.published is None:
+            return None
+        return (now or time.time()) - self.published
+
+    def published_date(self):
+        """Publish time as YYYY-MM-DD (UTC), or 'Unknown'"""
+        if self.published is None:
+            return 'Unknown'
+        return time.strftime('%Y-%m-%d', time.gmtime(self.published))
+
+    def __repr__(self):
+        return f"Article({self.title[:40]!r}, {self.link!r})"
+
+# ================================
+# HELPERS
+# ================================
+
+def entry_timestamp(entry):
+    """UTC epoch seconds of a feedparser entry's publish time, or None"""
+    parsed = entry.get('published_parsed')
+    if not parsed:
+        return None
+    try:
+        # feedparser normalizes dates to UTC struct_time
+        return float(calendar.timegm(parsed))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def feed_source(feed, url, default=None):
+    """Display name of a feed: its title, else `default`, else the URL's host"""
+    title = feed.feed.get('title') if hasattr(feed, 'feed') else None
+    if title:
+        return title
+    return default or url.split('//')[-1].split('/')[0]
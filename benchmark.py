@@ -0,0 +1,173 @@
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+import replay
+import storage
+
+# ================================
+# CONFIGURATION
+# ================================
+
+BOTS = ['post1', 'post2', 'post3', 'post4', 'web1', 'gnews', 'ai1', 'foot1']
+
+FIXTURES_DIR = os.environ.get(
+    'BENCH_FIXTURES_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+)
+
+# Placeholder credentials so the bots get past their startup checks offline
+DUMMY_ENV = {
+    'TWITTER_API_KEY': 'bench',
+    'TWITTER_API_SECRET': 'bench',
+    'TWITTER_ACCESS_TOKEN': 'bench',
+    'TWITTER_ACCESS_TOKEN_SECRET': 'bench',
+    'GEMINI_API_KEY': 'bench',
+}
+
+# ================================
+# INSTRUMENTATION
+# ================================
+# HTTP stages come from the replay session; feed parsing and deliberate
+# sleeps are timed by wrapping feedparser.parse and time.sleep.
+
+_timers = {}
+_timers_lock = threading.Lock()
+
+def _timed(stage, func):
+    def wrapper(*args, **kwargs):
+        started = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with _timers_lock:
+                timer = _timers.setdefault(stage, {'calls': 0, 'seconds': 0.0, 'bytes': 0})
+                timer['calls'] += 1
+                timer['seconds'] += time.monotonic() - started
+    return wrapper
+
+def instrument():
+    """Wrap the non-HTTP stages we want in the breakdown"""
+    import feedparser
+    feedparser.parse = _timed('parse', feedparser.parse)
+    time.sleep = _timed('sleep', time.sleep)
+
+def fixture_path(bot):
+    return os.path.join(FIXTURES_DIR, f"{bot}.json")
+
+# ================================
+# RUNNING
+# ================================
+
+def fresh_cache(bot):
+    """Point the cache at a new empty directory for a cold run of `bot`"""
+    os.makedirs(os.environ['BOT_CACHE_DIR'], exist_ok=True)
+    path = tempfile.mkdtemp(prefix=f"{bot}-", dir=os.environ['BOT_CACHE_DIR'])
+    storage.set_cache_dir(path)
+    return path
+
+def run_once(bot, mode, latency='recorded', host_latency=None, quiet=True, seed=0):
+    """Run one bot's main() under a record/replay session and return its stats"""
+    _timers.clear()
+    random.seed(seed)
+    module = importlib.import_module(bot)
+    output = io.StringIO()
+    error = None
+
+    session = replay.start(fixture_path(bot), mode, latency, host_latency)
+    started = time.monotonic()
+    try:
+        with contextlib.redirect_stdout(output if quiet else sys.stdout):
+            module.main()
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        wall = time.monotonic() - started
+        replay.stop()
+
+    stages = {stage: dict(stat) for stage, stat in session.stats.items()}
+    stages.update({stage: dict(stat) for stage, stat in _timers.items()})
+    return {
+        'bot': bot,
+        'wall': wall,
+        'stages': stages,
+        'misses': list(session.misses),
+        'error': error,
+    }
+
+def print_report(result, run_number):
+    print(f"\n📊 {result['bot']} run {run_number}: {result['wall']:.3f}s wall (stage seconds are summed across threads)")
+    print(f"   {'stage':<8} {'calls':>6} {'seconds':>9} {'bytes':>10}")
+    for stage, stat in sorted(result['stages'].items(), key=lambda item: -item[1]['seconds']):
+        print(f"   {stage:<8} {stat['calls']:>6} {stat['seconds']:>9.3f} {stat['bytes']:>10}")
+    if result['misses']:
+        print(f"   ⚠️ {len(result['misses'])} requests had no recorded response, e.g. {result['misses'][0]}")
+    if result['error']:
+        print(f"   💥 main() raised:\n{result['error']}")
+
+def _parse_host_latency(items):
+    host_latency = {}
+    for item in items or []:
+        host, _, seconds = item.partition('=')
+        host_latency[host.strip().lower()] = float(seconds)
+    return host_latency
+
+# ================================
+# MAIN
+# ================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Record bot HTTP traffic and benchmark bots offline against it")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    record = sub.add_parser('record', help="run bots against the live network and save fixtures (tweets are never posted)")
+    record.add_argument('bots', nargs='*', default=BOTS)
+
+    run = sub.add_parser('run', help="replay fixtures and report timings")
+    run.add_argument('bots', nargs='*', default=BOTS)
+    run.add_argument('--latency', default='recorded', help="'recorded' or a fixed delay in seconds per request")
+    run.add_argument('--host-latency', action='append', metavar='HOST=SECONDS', help="per-host delay override")
+    run.add_argument('--repeat', type=int, default=1, help="runs per bot; each bot's first run starts with an empty cache")
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--verbose', action='store_true', help="show the bots' own output")
+    args = parser.parse_args()
+
+    # Keep benchmark runs away from the real cache and history; each bot gets
+    # its own empty directory inside this one
+    os.environ.setdefault('BOT_CACHE_DIR', tempfile.mkdtemp(prefix='bot-bench-'))
+    for name, value in DUMMY_ENV.items():
+        if args.command == 'run' or name.startswith('TWITTER_'):
+            os.environ.setdefault(name, value)
+    print(f"🗂️ Cache directory: {os.environ['BOT_CACHE_DIR']}")
+
+    if args.command == 'record':
+        for bot in args.bots:
+            print(f"\n🎙️ Recording {bot}...")
+            fresh_cache(bot)
+            result = run_once(bot, 'record', quiet=False)
+            print_report(result, 1)
+        return
+
+    latency = args.latency if args.latency == 'recorded' else float(args.latency)
+    host_latency = _parse_host_latency(args.host_latency)
+    instrument()
+
+    for bot in args.bots:
+        if not os.path.exists(fixture_path(bot)):
+            print(f"\n⏭️ No fixture for {bot}, run: python benchmark.py record {bot}")
+            continue
+        print(f"\n🗂️ {bot} cache: {fresh_cache(bot)}")
+        for run_number in range(1, args.repeat + 1):
+            result = run_once(bot, 'replay', latency, host_latency, quiet=not args.verbose, seed=args.seed)
+            print_report(result, run_number)
+
+if __name__ == "__main__":
+    main()
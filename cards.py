@@ -0,0 +1,173 @@
+import functools
+import io
+import os
+import re
+import threading
+
+from PIL import Image, ImageDraw, ImageFont
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Set QUOTE_CARDS=false to post text-only tweets again
+ENABLED = os.environ.get('QUOTE_CARDS', 'true').lower() != 'false'
+
+CARD_SIZE = (1200, 675)
+MARGIN = 80
+JPEG_QUALITY = 85
+
+# Headline font sizes tried from largest down until the text fits
+FONT_SIZES = (72, 64, 56, 48, 42, 36)
+FOOTER_SIZE = 28
+
+# First font that exists wins; CARD_FONT overrides them all
+FONT_PATHS = [
+    os.environ.get('CARD_FONT', ''),
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf',
+    '/Library/Fonts/Arial Bold.ttf',
+    'C:/Windows/Fonts/arialbd.ttf',
+]
+
+# Background gradient (top, bottom), accent bar and footer label per bot or
+# persona; names not listed use 'default'
+THEMES = {
+    'default': {'top': (24, 32, 48), 'bottom': (10, 12, 20), 'accent': (90, 160, 255), 'label': ''},
+    'ai1': {'top': (20, 24, 60), 'bottom': (8, 8, 24), 'accent': (140, 110, 255), 'label': 'AI & ML'},
+    'post4': {'top': (40, 28, 20), 'bottom': (16, 10, 8), 'accent': (255, 150, 60), 'label': 'Worth a read'},
+    'foot1': {'top': (14, 60, 34), 'bottom': (6, 24, 14), 'accent': (120, 220, 120), 'label': 'Football'},
+    'fan_philosopher': {'top': (46, 20, 60), 'bottom': (18, 8, 24), 'accent': (220, 140, 255), 'label': 'Football'},
+    'tactical_nerd': {'top': (14, 60, 34), 'bottom': (6, 24, 14), 'accent': (255, 255, 255), 'label': 'Tactics'},
+    'data_driven': {'top': (12, 40, 64), 'bottom': (6, 14, 26), 'accent': (80, 200, 255), 'label': 'By the numbers'},
+    'transfer_whisperer': {'top': (64, 20, 20), 'bottom': (24, 8, 8), 'accent': (255, 200, 60), 'label': 'Transfers'},
+    'cultural_historian': {'top': (60, 48, 24), 'bottom': (24, 18, 8), 'accent': (240, 210, 150), 'label': 'From the archive'},
+}
+
+# Characters the card fonts can't draw: emoji outside the BMP, joiners
+# and variation selectors
+UNDRAWABLE_RE = re.compile('[\U00010000-\U0010FFFF\u200d\ufe0e\ufe0f]')
+
+_render_lock = threading.Lock()
+
+# ================================
+# CACHED RESOURCES
+# ================================
+# Fonts and gradient backgrounds are built once per process and reused, so
+# a card costs one copy, a few text draws and a JPEG encode.
+
+@functools.lru_cache(maxsize=None)
+def font(size):
+    """Bold font at `size`, falling back to Pillow's built-in font"""
+    for path in FONT_PATHS:
+        if path and os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size)
+
+@functools.lru_cache(maxsize=None)
+def background(theme):
+    """Pre-rendered gradient with the theme's accent bar and label"""
+    colors = THEMES.get(theme, THEMES['default'])
+    width, height = CARD_SIZE
+
+    # One column of the vertical gradient, stretched across the card
+    column = Image.new('RGB', (1, height))
+    top, bottom = colors['top'], colors['bottom']
+    column.putdata([
+        tuple(round(t + (b - t) * y / (height - 1)) for t, b in zip(top, bottom))
+        for y in range(height)
+    ])
+    image = column.resize(CARD_SIZE)
+
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([MARGIN, MARGIN - 30, MARGIN + 120, MARGIN - 22], fill=colors['accent'])
+    if colors['label']:
+        draw.text((MARGIN, height - MARGIN), colors['label'].upper(), font=font(FOOTER_SIZE),
+                  fill=colors['accent'], anchor='ls')
+    return image
+
+# ================================
+# RENDERING
+# ================================
+
+def _wrap(text, text_font, max_width):
+    """Greedy word wrap using measured text widths"""
+    lines = []
+    line = ''
+    for word in text.split():
+        candidate = f"{line} {word}".strip()
+        if not line or text_font.getlength(candidate) <= max_width:
+            line = candidate
+        else:
+            lines.append(line)
+            line = word
+    if line:
+        lines.append(line)
+    return lines
+
+def _layout(text):
+    """Largest font size whose wrapped lines fit the card, with those lines"""
+    max_width = CARD_SIZE[0] - 2 * MARGIN
+    max_height = CARD_SIZE[1] - 2 * MARGIN - FOOTER_SIZE * 2
+    for size in FONT_SIZES:
+        text_font = font(size)
+        lines = _wrap(text, text_font, max_width)
+        if len(lines) * size * 1.25 <= max_height and all(text_font.getlength(l) <= max_width for l in lines):
+            return text_font, lines
+    # Still too long at the smallest size: keep what fits and mark the cut
+    text_font = font(FONT_SIZES[-1])
+    lines = _wrap(text, text_font, max_width)
+    keep = max(1, int(max_height // (FONT_SIZES[-1] * 1.25)))
+    if len(lines) > keep:
+        lines = lines[:keep]
+        lines[-1] = lines[-1].rstrip('.,;:') + '…'
+    return text_font, lines
+
+def headline_of(tweet):
+    """Card headline for a tweet: its first line without hashtags, links or emoji"""
+    text = re.sub(r'https?://\S+|#\w+', '', tweet or '')
+    text = UNDRAWABLE_RE.sub('', text)
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return lines[0] if lines else ''
+
+def render(headline, theme='default'):
+    """Draw `headline` onto the theme's card and return it as a JPEG BytesIO"""
+    headline = ' '.join(UNDRAWABLE_RE.sub('', headline or '').split())
+    with _render_lock:
+        # The cached background is shared, copy it before drawing
+        image = background(theme).copy()
+    text_font, lines = _layout(headline)
+
+    draw = ImageDraw.Draw(image)
+    line_height = text_font.size * 1.25
+    y = (CARD_SIZE[1] - line_height * len(lines)) / 2
+    for line in lines:
+        draw.text((MARGIN, y), line, font=text_font, fill=(255, 255, 255))
+        y += line_height
+
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=JPEG_QUALITY)
+    output.seek(0)
+    return output
+
+def upload(api, headline, theme='default'):
+    """Render a card and upload it with a tweepy v1.1 API; returns the media id string"""
+    media = api.media_upload(filename='card.jpg', file=render(headline, theme))
+    return media.media_id_string
+
+def upload_for(api, tweet, theme='default'):
+    """
+    Upload a card headlined by the tweet itself; returns a list of media ids,
+    empty when cards are off, the tweet has no drawable text or the upload
+    fails.
+    """
+    headline = headline_of(tweet)
+    if not ENABLED or not headline:
+        return []
+    try:
+        media_id = upload(api, headline, theme)
+        print(f"🪧 Quote card uploaded! ID: {media_id}")
+        return [media_id]
+    except Exception as e:
+        print(f"⚠️ Failed to upload quote card: {e}")
+        return []
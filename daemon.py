@@ -0,0 +1,223 @@
+import argparse
+import importlib
+import os
+import signal
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Cron schedules (UTC) copied from each bot's GitHub workflow, where they are
+# currently commented out. post1 has no workflow, so it has no schedule.
+SCHEDULES = {
+    'post2': '0 15,23 * * *',    # post1.yml
+    'post3': '0 14 * * *',       # post3.yml
+    'post4': '0 9,21 * * *',     # post4.yml
+    'web1': '0 15 * * *',        # web1.yml
+    'gnews': '0 10 * * *',       # gnews.yml
+    'ai1': '0 18 * * *',         # AI.yml
+    'foot1': '0 9,21 * * *',     # foot1.yml
+}
+
+# Like the workflows, nothing is scheduled until opted in: pick the hosted bots
+# with DAEMON_BOTS="post3,gnews" (or "all") or --bots, and override or add
+# schedules with DAEMON_SCHEDULES="post3=0 */6 * * *;gnews=30 10 * * *"
+SCHEDULE_OVERRIDES = os.environ.get('DAEMON_SCHEDULES', '')
+ENABLED_BOTS = os.environ.get('DAEMON_BOTS', '')
+
+CRON_FIELDS = [
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 6),
+]
+
+_stop = threading.Event()
+
+# ================================
+# CRON SCHEDULES
+# ================================
+
+def _parse_field(field, low, high):
+    """Set of values matched by one cron field (*, lists, ranges and steps)"""
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/')
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-'))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        values.update(range(start, end + 1, step))
+    return values
+
+def parse_cron(expression):
+    """Parse a five-field cron expression into a schedule dict"""
+    fields = expression.split()
+    if len(fields) != len(CRON_FIELDS):
+        raise ValueError(f"Expected 5 cron fields, got {expression!r}")
+
+    schedule = {}
+    for (name, low, high), field in zip(CRON_FIELDS, fields):
+        values = _parse_field(field, low, 7 if name == 'weekday' else high)
+        if name == 'weekday':
+            values = {v % 7 for v in values}  # 7 is also Sunday
+        if not values or min(values) < low or max(values) > high:
+            raise ValueError(f"Invalid {name} field {field!r} in {expression!r}")
+        schedule[name] = values
+    schedule['any_day'] = fields[2] == '*'
+    schedule['any_weekday'] = fields[4] == '*'
+    return schedule
+
+def cron_matches(schedule, moment):
+    """True if the schedule fires at the given minute"""
+    if moment.minute not in schedule['minute'] or moment.hour not in schedule['hour']:
+        return False
+    if moment.month not in schedule['month']:
+        return False
+
+    day_ok = moment.day in schedule['day']
+    weekday_ok = (moment.weekday() + 1) % 7 in schedule['weekday']
+    # Like cron: when both day fields are restricted, either one may match
+    if not schedule['any_day'] and not schedule['any_weekday']:
+        return day_ok or weekday_ok
+    return day_ok and weekday_ok
+
+def next_run(schedule, after):
+    """First minute after `after` when the schedule fires, within a year"""
+    moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    for _ in range(366 * 24 * 60):
+        if cron_matches(schedule, moment):
+            return moment
+        moment += timedelta(minutes=1)
+    return None
+
+def _format_next(schedule, after):
+    """Next run time for display; impossible dates like '0 0 31 2 *' never fire"""
+    moment = next_run(schedule, after)
+    return f"{moment:%Y-%m-%d %H:%M} UTC" if moment else "never"
+
+def load_schedules(enabled_bots=ENABLED_BOTS):
+    """
+    Bot name -> parsed schedule for the opted-in bots, after applying the
+    environment overrides. Returns nothing unless bots were opted in.
+    """
+    expressions = dict(SCHEDULES)
+    for item in SCHEDULE_OVERRIDES.split(';'):
+        if '=' in item:
+            name, expression = item.split('=', 1)
+            expressions[name.strip()] = expression.strip()
+
+    enabled = {name.strip() for name in enabled_bots.split(',') if name.strip()}
+    if 'all' not in enabled:
+        expressions = {name: expr for name, expr in expressions.items() if name in enabled}
+
+    return {name: (expr, parse_cron(expr)) for name, expr in expressions.items()}
+
+# ================================
+# RUNNING BOTS
+# ================================
+
+def load_bots(names):
+    """Import each bot module once so its imports and pools stay warm"""
+    bots = {}
+    for name in names:
+        try:
+            bots[name] = importlib.import_module(name)
+            print(f"📦 Loaded {name}")
+        except Exception as e:
+            print(f"❌ Could not load {name}: {e}")
+    return bots
+
+def run_bot(name, module):
+    """Run one bot's main(), never letting an error reach the scheduler"""
+    started = time.monotonic()
+    print(f"\n▶️ [{datetime.now(timezone.utc):%Y-%m-%d %H:%M} UTC] Running {name}")
+    try:
+        module.main()
+    except Exception:
+        print(f"💥 {name} crashed:")
+        traceback.print_exc()
+    print(f"⏹️ {name} finished in {time.monotonic() - started:.1f}s")
+
+def serve(schedules, bots):
+    """Fire bots on their schedules until SIGINT/SIGTERM"""
+    running = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, len(bots)))
+
+    for name, (expression, schedule) in schedules.items():
+        if name in bots:
+            print(f"🗓️ {name}: '{expression}', next run {_format_next(schedule, datetime.now(timezone.utc))}")
+
+    try:
+        while not _stop.is_set():
+            # Sleep to the start of the next minute
+            now = datetime.now(timezone.utc)
+            wake = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+            if _stop.wait((wake - now).total_seconds()):
+                break
+
+            for name, (expression, schedule) in schedules.items():
+                if name not in bots or not cron_matches(schedule, wake):
+                    continue
+                if name in running and not running[name].done():
+                    print(f"⏭️ {name} is still running, skipping this slot")
+                    continue
+                running[name] = executor.submit(run_bot, name, bots[name])
+    finally:
+        print("🛑 Stopping, waiting for running bots to finish...")
+        executor.shutdown(wait=True)
+
+def _handle_signal(signum, frame):
+    _stop.set()
+
+# ================================
+# MAIN
+# ================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Host every bot in one long-running process")
+    parser.add_argument('--once', nargs='+', metavar='BOT', help="run these bots once and exit")
+    parser.add_argument('--bots', help="comma-separated bots to schedule, or 'all' (default: $DAEMON_BOTS)")
+    parser.add_argument('--list', action='store_true', help="show schedules and next run times")
+    args = parser.parse_args()
+
+    if args.once:
+        bots = load_bots(args.once)
+        for name, module in bots.items():
+            run_bot(name, module)
+        return
+
+    schedules = load_schedules(args.bots if args.bots is not None else ENABLED_BOTS)
+    if args.list:
+        now = datetime.now(timezone.utc)
+        for name, (expression, schedule) in schedules.items():
+            print(f"{name:8} {expression:16} next {_format_next(schedule, now)}")
+        if not schedules:
+            print("No bots enabled; set DAEMON_BOTS or pass --bots")
+        return
+
+    print("🤖 Bot daemon starting...")
+    print("=" * 50)
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    bots = load_bots(schedules)
+    if not bots:
+        print("❌ No bots to run; set DAEMON_BOTS or pass --bots")
+        return
+    serve(schedules, bots)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import hashlib
+import re
+from urllib.parse import parse_qsl, unquote, urlencode, urlparse, urlunparse
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Query parameters that identify the page itself and survive canonicalization
+IDENTITY_PARAMS = {'id', 'v', 'p', 'story', 'article', 'item'}
+
+# Redirectors whose real target sits in a query parameter
+REDIRECT_PARAMS = {
+    'www.google.com': ('url', 'q'),
+    'google.com': ('url', 'q'),
+    'l.facebook.com': ('u',),
+    'out.reddit.com': ('url',),
+}
+
+# Hamming distance between title SimHashes that still counts as the same story.
+# Titles are split into MAX_DISTANCE + 1 bands, so any pair within the distance
+# shares at least one band and is found without comparing every pair.
+MAX_DISTANCE = 3
+SIMHASH_BITS = 64
+
+STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'with', 'at',
+    'by', 'from', 'is', 'are', 'was', 'its', 'it', 'as', 'after', 'new', 'how',
+    'why', 'what', 'this', 'that', 'now', 'over', 'into', 'says', 'report',
+}
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# ================================
+# URL CANONICALIZATION
+# ================================
+
+def canonical_url(url):
+    """
+    Canonical form of an article URL: redirect wrappers unwrapped, lowercase
+    host without www./m./amp., tracking query and fragment dropped, no AMP
+    suffix or trailing slash.
+    """
+    if not url:
+        return ''
+    parts = urlparse(url.strip())
+    host = (parts.hostname or '').lower()
+
+    for param in REDIRECT_PARAMS.get(host, ()):
+        target = dict(parse_qsl(parts.query)).get(param)
+        if target and target.startswith('http'):
+            return canonical_url(unquote(target))
+
+    for prefix in ('www.', 'm.', 'amp.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+
+    path = re.sub(r'/(amp|amp\.html)/?$', '', parts.path) or '/'
+    path = path.rstrip('/') or '/'
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query) if k.lower() in IDENTITY_PARAMS
+    ))
+    return urlunparse(('https', host, path, '', query, ''))
+
+# ================================
+# TITLE SIMILARITY
+# ================================
+
+def title_tokens(title):
+    """Lowercase content words of a title"""
+    return [w for w in WORD_RE.findall((title or '').lower()) if w not in STOPWORDS]
+
+def simhash(title):
+    """64-bit SimHash over a title's words and word pairs"""
+    tokens = title_tokens(title)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not features:
+        return 0
+
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+def _bands(fingerprint, count):
+    """Split a fingerprint into `count` (band index, value) keys"""
+    width = SIMHASH_BITS // count
+    mask = (1 << width) - 1
+    return [(i, fingerprint >> (i * width) & mask) for i in range(count)]
+
+# ================================
+# STORY CLUSTERING
+# ================================
+
+def _representative(cluster):
+    """Best article of a story: has an image, then the longest summary, then first seen"""
+    if len(cluster) == 1:
+        # Don't look up images for stories only one outlet ran
+        return cluster[0]
+    return max(cluster, key=lambda a: (bool(a.image_url), len(a.summary)))
+
+def dedupe_articles(articles, max_distance=MAX_DISTANCE):
+    """
+    Collapse Articles about the same story into one.
+    Articles match when their canonical URLs are equal or their title
+    SimHashes are within `max_distance` bits. Each kept article gets
+    `source_count`, `sources` (all outlets that ran it) and `links`
+    (every article URL in the story).
+    """
+    parent = list(range(len(articles)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        parent[find(i)] = find(j)
+
+    by_url = {}
+    buckets = {}
+    fingerprints = []
+    for i, article in enumerate(articles):
+        url = article.canonical_url
+        if url and url in by_url:
+            union(i, by_url[url])
+        elif url:
+            by_url[url] = i
+
+        fingerprint = simhash(article.title_lower)
+        fingerprints.append(fingerprint)
+        if not fingerprint:
+            continue
+        for band in _bands(fingerprint, max_distance + 1):
+            for j in buckets.get(band, ()):
+                if find(i) != find(j) and hamming(fingerprint, fingerprints[j]) <= max_distance:
+                    union(i, j)
+            buckets.setdefault(band, []).append(i)
+
+    clusters = {}
+    for i, article in enumerate(articles):
+        clusters.setdefault(find(i), []).append(article)
+
+    stories = []
+    for cluster in clusters.values():
+        representative = _representative(cluster)
+        representative.source_count = len({a.source for a in cluster})
+        representative.sources = sorted({a.source for a in cluster})
+        representative.links = [a.link for a in cluster]
+        stories.append(representative)
+    return stories
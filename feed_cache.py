@@ -0,0 +1,68 @@
+import hashlib
+import os
+import pickle
+import threading
+
+import feedparser
+
+from storage import cache_path
+
+# ================================
+# ON-DISK FEED CACHE
+# ================================
+# One pickle per feed URL holding the validators the server gave us
+# (ETag / Last-Modified), a hash of the body and the parsed feed, so an
+# unchanged feed costs neither a download nor a re-parse.
+
+def _entry_path(url):
+    """Cache file for a feed URL"""
+    name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return cache_path('feeds', f"{name}.pickle")
+
+def body_hash(body):
+    """Content hash used to detect unchanged feed bodies"""
+    return hashlib.sha256(body).hexdigest()
+
+def load(url):
+    """Return the cached record for a feed, or None"""
+    try:
+        with open(_entry_path(url), 'rb') as f:
+            record = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Discarding unreadable feed cache for {url}: {e}")
+        return None
+    return record if record.get('url') == url else None
+
+def conditional_headers(record):
+    """If-None-Match / If-Modified-Since headers for a cached feed"""
+    headers = {}
+    if record and record.get('etag'):
+        headers['If-None-Match'] = record['etag']
+    if record and record.get('modified'):
+        headers['If-Modified-Since'] = record['modified']
+    return headers
+
+def store(url, etag, modified, digest, feed):
+    """Save a feed and its validators, replacing any previous record atomically"""
+    # Exceptions raised by the XML parser are not always picklable
+    feed = feedparser.FeedParserDict(feed)
+    feed.pop('bozo_exception', None)
+    record = {
+        'url': url,
+        'etag': etag,
+        'modified': modified,
+        'hash': digest,
+        'feed': feed,
+    }
+    path = _entry_path(url)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except Exception as e:
+        print(f"⚠️ Could not cache feed {url}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
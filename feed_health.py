@@ -0,0 +1,205 @@
+import json
+import threading
+import time
+
+import storage
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Consecutive failures that open a feed's circuit breaker
+BREAKER_THRESHOLD = 3
+
+# Seconds an open breaker waits before probing the feed again; doubles with
+# every further failure up to MAX_COOLDOWN
+BASE_COOLDOWN = 3600
+MAX_COOLDOWN = 7 * 24 * 3600
+
+# Recent samples kept per feed for latency percentiles and entry yield
+RECENT_SAMPLES = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feed_health (
+    url TEXT PRIMARY KEY,
+    successes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    failure_streak INTEGER NOT NULL DEFAULT 0,
+    last_success REAL,
+    last_failure REAL,
+    last_error TEXT,
+    last_changed REAL,
+    latencies TEXT NOT NULL DEFAULT '[]',
+    entry_counts TEXT NOT NULL DEFAULT '[]',
+    change_intervals TEXT NOT NULL DEFAULT '[]',
+    retry_at REAL NOT NULL DEFAULT 0
+);
+"""
+
+_write_lock = threading.Lock()
+
+# ================================
+# HELPERS
+# ================================
+
+def _db():
+    return storage.connect('feed_health.sqlite', SCHEMA)
+
+def _push(samples_json, value):
+    """Append a sample to a JSON list, keeping the most recent ones"""
+    samples = json.loads(samples_json or '[]')
+    samples.append(value)
+    return json.dumps(samples[-RECENT_SAMPLES:])
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list, or None when it is empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def _row(url):
+    cursor = _db().execute("SELECT * FROM feed_health WHERE url = ?", (url,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip([column[0] for column in cursor.description], row))
+
+def _ensure(conn, url):
+    conn.execute("INSERT OR IGNORE INTO feed_health (url) VALUES (?)", (url,))
+
+# ================================
+# RECORDING
+# ================================
+
+def record_success(url, latency, entry_count, changed):
+    """Record a successful fetch; `changed` is False for 304s and identical bodies"""
+    now = time.time()
+    with _write_lock:
+        conn = _db()
+        _ensure(conn, url)
+        row = _row(url)
+        change_intervals = row['change_intervals']
+        last_changed = row['last_changed']
+        if changed:
+            if last_changed:
+                change_intervals = _push(change_intervals, round(now - last_changed))
+            last_changed = now
+        conn.execute(
+            """UPDATE feed_health SET
+                successes = successes + 1, failure_streak = 0, last_success = ?,
+                last_changed = ?, latencies = ?, entry_counts = ?,
+                change_intervals = ?, retry_at = 0
+            WHERE url = ?""",
+            (
+                now, last_changed,
+                _push(row['latencies'], round(latency, 3)),
+                _push(row['entry_counts'], entry_count),
+                change_intervals, url
+            )
+        )
+        conn.commit()
+
+def record_failure(url, latency, error):
+    """Record a failed fetch and open the breaker once failures pile up"""
+    now = time.time()
+    with _write_lock:
+        conn = _db()
+        _ensure(conn, url)
+        row = _row(url)
+        streak = row['failure_streak'] + 1
+        retry_at = 0
+        if streak >= BREAKER_THRESHOLD:
+            retry_at = now + min(MAX_COOLDOWN, BASE_COOLDOWN * 2 ** (streak - BREAKER_THRESHOLD))
+        conn.execute(
+            """UPDATE feed_health SET
+                failures = failures + 1, failure_streak = ?, last_failure = ?,
+                last_error = ?, latencies = ?, retry_at = ?
+            WHERE url = ?""",
+            (streak, now, str(error)[:200], _push(row['latencies'], round(latency, 3)), retry_at, url)
+        )
+        conn.commit()
+
+# ================================
+# CIRCUIT BREAKER
+# ================================
+
+def admit(urls):
+    """
+    Feeds worth fetching this run, healthiest and fastest first.
+    Feeds with an open breaker are skipped until their cooldown passes,
+    then let through once as a probe. If every feed is tripped, all of
+    them are probed rather than fetching nothing.
+    """
+    urls = list(urls)
+    now = time.time()
+    admitted = []
+    skipped = []
+
+    for url in urls:
+        row = _row(url)
+        if row and row['failure_streak'] >= BREAKER_THRESHOLD and now < row['retry_at']:
+            skipped.append((url, row))
+            continue
+        streak = row['failure_streak'] if row else 0
+        p95 = percentile(json.loads(row['latencies']), 0.95) if row else None
+        admitted.append((streak, p95 or 0, url))
+
+    if not admitted:
+        return urls
+
+    for url, row in skipped:
+        hours = (row['retry_at'] - now) / 3600
+        print(f"⛔ Skipping {url}: failed {row['failure_streak']} times in a row, next probe in {hours:.1f}h")
+
+    return [url for _, _, url in sorted(admitted, key=lambda item: (item[0], item[1]))]
+
+# ================================
+# REPORT
+# ================================
+
+def summary(url):
+    """Health figures for one feed, or None if it was never fetched"""
+    row = _row(url)
+    if row is None:
+        return None
+    latencies = json.loads(row['latencies'])
+    entry_counts = json.loads(row['entry_counts'])
+    change_intervals = json.loads(row['change_intervals'])
+    return {
+        'url': url,
+        'successes': row['successes'],
+        'failures': row['failures'],
+        'failure_streak': row['failure_streak'],
+        'last_success': row['last_success'],
+        'last_error': row['last_error'],
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'avg_entries': sum(entry_counts) / len(entry_counts) if entry_counts else None,
+        'change_every': percentile(change_intervals, 0.5),
+        'breaker_open': row['failure_streak'] >= BREAKER_THRESHOLD,
+    }
+
+def report(limit=20):
+    """Print the worst feeds: longest failure streaks, then slowest"""
+    urls = [row[0] for row in _db().execute("SELECT url FROM feed_health")]
+    feeds = [summary(url) for url in urls]
+    feeds.sort(key=lambda f: (-f['failure_streak'], -f['failures'], -(f['p95'] or 0)))
+
+    print(f"{'streak':>6} {'ok':>5} {'fail':>5} {'p50':>6} {'p95':>6} {'entries':>7} {'changes':>8}  feed")
+    for f in feeds[:limit]:
+        p50 = f"{f['p50']:.2f}" if f['p50'] is not None else '-'
+        p95 = f"{f['p95']:.2f}" if f['p95'] is not None else '-'
+        entries = f"{f['avg_entries']:.1f}" if f['avg_entries'] is not None else '-'
+        changes = f"{f['change_every'] / 3600:.1f}h" if f['change_every'] else '-'
+        flag = '⛔ ' if f['breaker_open'] else ''
+        print(f"{f['failure_streak']:>6} {f['successes']:>5} {f['failures']:>5} {p50:>6} {p95:>6} {entries:>7} {changes:>8}  {flag}{f['url']}")
+        if f['failure_streak'] and f['last_error']:
+            print(f"{'':>47}↳ {f['last_error']}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List the least healthy RSS feeds")
+    parser.add_argument('--limit', type=int, default=20)
+    report(parser.parse_args().limit)
@@ -0,0 +1,228 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+
+import feed_cache
+import feed_health
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Total feeds downloaded at once across all hosts
+MAX_WORKERS = 16
+
+# Feeds downloaded at once from the same host
+MAX_PER_HOST = 2
+
+# Seconds a single feed may take from request to last byte
+FEED_TIMEOUT = 15
+
+# Minimum seconds between request starts on the same host, with overrides
+# for hosts that throttle unauthenticated clients
+HOST_INTERVAL = 0.25
+HOST_INTERVALS = {
+    'www.reddit.com': 1.0,
+    'reddit.com': 1.0,
+}
+
+# Wait used after a 429/503 that carries no usable Retry-After
+DEFAULT_RETRY_AFTER = 5
+
+# Times a throttled feed is retried while its deadline allows
+THROTTLE_RETRIES = 2
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+_session = None
+_session_lock = threading.Lock()
+
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+# Host -> monotonic time its next request may start
+_host_next = {}
+_host_next_lock = threading.Lock()
+
+# ================================
+# HELPERS
+# ================================
+
+def get_session():
+    """Shared keep-alive session for feed downloads"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            _session = session
+    return _session
+
+def host_of(url):
+    """Lowercase hostname of a URL"""
+    return (urlparse(url).hostname or '').lower()
+
+def _host_slot(url):
+    """Semaphore limiting concurrent downloads from one host"""
+    host = host_of(url)
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(MAX_PER_HOST)
+            _host_slots[host] = slot
+    return slot
+
+class ThrottledError(TimeoutError):
+    """Our own per-host spacing ran past a feed's deadline; the feed itself never answered slowly"""
+
+def _wait_turn(url, deadline):
+    """
+    Reserve the next request slot on this host and sleep until it starts.
+    Requests to different hosts never wait on each other.
+    """
+    host = host_of(url)
+    interval = HOST_INTERVALS.get(host, HOST_INTERVAL)
+    with _host_next_lock:
+        now = time.monotonic()
+        start = max(now, _host_next.get(host, 0))
+        if start > deadline:
+            raise ThrottledError(f"{host} is throttled past the feed deadline")
+        _host_next[host] = start + interval
+    if start > now:
+        time.sleep(start - now)
+
+def _back_off_host(url, seconds):
+    """Hold off every request to this host for `seconds`"""
+    host = host_of(url)
+    with _host_next_lock:
+        _host_next[host] = max(_host_next.get(host, 0), time.monotonic() + seconds)
+
+def retry_after(response, default=DEFAULT_RETRY_AFTER):
+    """Seconds to wait from a Retry-After header (delay or HTTP date)"""
+    value = (response.headers.get('Retry-After') or '').strip()
+    if value.isdigit():
+        return int(value)
+    if value:
+        try:
+            return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return default
+
+def _read_body(response, deadline):
+    """Read a streamed response body, giving up once the deadline passes"""
+    chunks = []
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        if time.monotonic() > deadline:
+            raise TimeoutError("feed download exceeded timeout")
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+# ================================
+# FETCHING
+# ================================
+
+def fetch_feed(url, timeout=FEED_TIMEOUT, headers=None):
+    """
+    Download and parse one feed within `timeout` seconds.
+    Sends a conditional request when the feed is cached and reuses the
+    cached parse on 304 Not Modified or an unchanged body. Requests are
+    spaced per host, and a 429/503 backs the host off for its Retry-After.
+    The outcome is recorded in the feed health registry, timed over the HTTP
+    request alone so queueing behind other feeds on the host doesn't count.
+    """
+    timer = {'seconds': 0.0}
+    try:
+        feed, changed = _fetch_feed(url, timeout, headers, timer)
+    except ThrottledError:
+        # Our scheduling ran out of time, not the feed
+        raise
+    except Exception as e:
+        feed_health.record_failure(url, timer['seconds'], e)
+        raise
+    feed_health.record_success(url, timer['seconds'], len(feed.entries), changed)
+    return feed
+
+def _fetch_feed(url, timeout, headers, timer):
+    """
+    Fetch one feed, returning (feed, changed since the cached copy).
+    Seconds spent on HTTP are added to timer['seconds'].
+    """
+    deadline = time.monotonic() + timeout
+    cached = feed_cache.load(url)
+    request_headers = dict(headers or {})
+    request_headers.update(feed_cache.conditional_headers(cached))
+
+    with _host_slot(url):
+        for attempt in range(THROTTLE_RETRIES + 1):
+            _wait_turn(url, deadline)
+            started = time.monotonic()
+            try:
+                response = get_session().get(url, headers=request_headers, timeout=timeout, stream=True)
+            finally:
+                timer['seconds'] += time.monotonic() - started
+            if response.status_code not in (429, 503) or attempt == THROTTLE_RETRIES:
+                break
+            # Throttled: the whole host backs off, then this feed tries again
+            response.close()
+            wait = retry_after(response)
+            _back_off_host(url, wait)
+            print(f"⏳ {host_of(url)} returned {response.status_code}, backing off {wait:.0f}s")
+
+        try:
+            if response.status_code == 304 and cached:
+                return cached['feed'], False
+            response.raise_for_status()
+            started = time.monotonic()
+            try:
+                body = _read_body(response, deadline)
+            finally:
+                timer['seconds'] += time.monotonic() - started
+        finally:
+            response.close()
+
+    digest = feed_cache.body_hash(body)
+    etag = response.headers.get('ETag')
+    modified = response.headers.get('Last-Modified')
+    if cached and cached['hash'] == digest:
+        if (etag, modified) != (cached['etag'], cached['modified']):
+            feed_cache.store(url, etag, modified, digest, cached['feed'])
+        return cached['feed'], False
+
+    feed = feedparser.parse(body)
+    feed_cache.store(url, etag, modified, digest, feed)
+    return feed, True
+
+def fetch_feeds(urls, timeout=FEED_TIMEOUT, headers=None, max_workers=MAX_WORKERS):
+    """
+    Fetch feeds concurrently, yielding (url, feed) in the order they finish.
+    Failed feeds are reported and skipped, and feeds whose circuit breaker
+    is open are not requested at all. Breaking out of the loop early
+    cancels downloads that have not started yet.
+    """
+    urls = feed_health.admit(urls)
+    if not urls:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)))
+    futures = {executor.submit(fetch_feed, url, timeout, headers): url for url in urls}
+    try:
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                feed = future.result()
+            except Exception as e:
+                print(f"⚠️ Error fetching {url}: {e}")
+                continue
+            yield url, feed
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,15 +1,14 @@
 import os
 import random
-import feedparser
 import re
-import tweepy
 import time
-import requests
 
-# =============================
-# GEMINI (NEW SDK)
-# =============================
-from google import genai
+import history
+import llm
+import publisher
+from articles import Article
+from keywords import KeywordMatcher
+from reddit import balance_by_subreddit, fetch_subreddit_feeds
 
 # =============================
 # CONFIGURATION
@@ -24,9 +23,8 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 AUTOMATED_MODE = True  # Changed to True for GitHub Actions
 
 # =============================
-# INITIALIZE GEMINI
+# GEMINI
 # =============================
-client = genai.Client(api_key=GEMINI_API_KEY)
 MODEL_NAME = "gemini-2.5-flash-lite"
 
 # =============================
@@ -45,86 +43,74 @@ REDDIT_RSS_FEEDS = [
     "https://www.reddit.com/r/MLS/.rss",
 ]
 
-posted_links = set()
-
 # =============================
 # ENHANCED CONTENT FILTERING
 # =============================
+# Meta/Reddit content
+META_KEYWORDS = [
+    '[meta]', '[mod]', '[announcement]', '[update]', '[discussion]',
+    'moderator', 'enforcement', 'rule change', 'subreddit', 'reddit',
+    'weekly thread', 'daily discussion', 'post-match thread',
+    'match thread', 'pre-match thread', 'transfer thread'
+]
+
+# Negative/controversial content (legal, violence, etc.)
+NEGATIVE_KEYWORDS = [
+    'jail', 'prison', 'arrest', 'charged', 'lawsuit', 'court',
+    'investigation', 'police', 'violent', 'assault', 'attack',
+    'racist', 'racism', 'abuse', 'scandal', 'corruption', 'banned',
+    'suspended', 'fine', 'punished', 'death', 'died', 'injury',
+    'serious injury', 'hospital', 'ambulance', 'riot', 'fight'
+]
+
+# Vague/low-quality content
+VAGUE_KEYWORDS = [
+    'thoughts?', 'opinions?', 'hot take', 'unpopular opinion',
+    'change my mind', 'am i the only one', 'does anyone else',
+    'what if', 'how come', 'why does', 'when will'
+]
+
+# Positive soccer keywords
+GOOD_SOCCER_KEYWORDS = [
+    # Match actions
+    'goal', 'win', 'victory', 'score', 'assist', 'save', 'tackle',
+    'pass', 'cross', 'header', 'volley', 'free kick', 'penalty',
+    'clean sheet', 'hat trick', 'comeback', 'equalizer', 'winner',
+    
+    # Positive performance
+    'brilliant', 'amazing', 'incredible', 'fantastic', 'great',
+    'excellent', 'outstanding', 'superb', 'quality', 'skill',
+    'talent', 'potential', 'promising', 'improving', 'progress',
+    
+    # Match events
+    'derby', 'rivalry', 'fixture', 'clash', 'battle', 'contest',
+    'tournament', 'competition', 'qualify', 'advance', 'progress',
+    
+    # Transfers and signings
+    'transfer', 'signing', 'contract', 'extension', 'loan',
+    'return', 'debut', 'first start', 'first goal',
+    
+    # Tactics and analysis
+    'tactics', 'formation', 'strategy', 'game plan', 'system',
+    'press', 'possession', 'counter attack', 'build up'
+]
+
+# Keyword lists compiled once for the content filters
+BAD_CONTENT_MATCHER = KeywordMatcher(META_KEYWORDS + NEGATIVE_KEYWORDS + VAGUE_KEYWORDS)
+GOOD_SOCCER_MATCHER = KeywordMatcher(GOOD_SOCCER_KEYWORDS)
+
 def is_bad_content(text):
     """Filter out non-soccer and negative content"""
     if not text:
         return True
     
-    text_lower = text.lower()
-    
-    # Meta/Reddit content
-    meta_keywords = [
-        '[meta]', '[mod]', '[announcement]', '[update]', '[discussion]',
-        'moderator', 'enforcement', 'rule change', 'subreddit', 'reddit',
-        'weekly thread', 'daily discussion', 'post-match thread',
-        'match thread', 'pre-match thread', 'transfer thread'
-    ]
-    
-    # Negative/controversial content (legal, violence, etc.)
-    negative_keywords = [
-        'jail', 'prison', 'arrest', 'charged', 'lawsuit', 'court',
-        'investigation', 'police', 'violent', 'assault', 'attack',
-        'racist', 'racism', 'abuse', 'scandal', 'corruption', 'banned',
-        'suspended', 'fine', 'punished', 'death', 'died', 'injury',
-        'serious injury', 'hospital', 'ambulance', 'riot', 'fight'
-    ]
-    
-    # Vague/low-quality content
-    vague_keywords = [
-        'thoughts?', 'opinions?', 'hot take', 'unpopular opinion',
-        'change my mind', 'am i the only one', 'does anyone else',
-        'what if', 'how come', 'why does', 'when will'
-    ]
-    
-    # Check all categories
-    if any(keyword in text_lower for keyword in meta_keywords):
-        return True
-    if any(keyword in text_lower for keyword in negative_keywords):
-        return True
-    if any(keyword in text_lower for keyword in vague_keywords):
-        return True
-    
-    return False
+    # Meta, negative and vague keywords are checked in one pass
+    return BAD_CONTENT_MATCHER.search(text) is not None
 
 def contains_good_soccer_content(text):
     """Check for positive soccer content"""
-    if not text:
-        return False
-    
-    text_lower = text.lower()
-    
-    # Positive soccer keywords
-    good_keywords = [
-        # Match actions
-        'goal', 'win', 'victory', 'score', 'assist', 'save', 'tackle',
-        'pass', 'cross', 'header', 'volley', 'free kick', 'penalty',
-        'clean sheet', 'hat trick', 'comeback', 'equalizer', 'winner',
-        
-        # Positive performance
-        'brilliant', 'amazing', 'incredible', 'fantastic', 'great',
-        'excellent', 'outstanding', 'superb', 'quality', 'skill',
-        'talent', 'potential', 'promising', 'improving', 'progress',
-        
-        # Match events
-        'derby', 'rivalry', 'fixture', 'clash', 'battle', 'contest',
-        'tournament', 'competition', 'qualify', 'advance', 'progress',
-        
-        # Transfers and signings
-        'transfer', 'signing', 'contract', 'extension', 'loan',
-        'return', 'debut', 'first start', 'first goal',
-        
-        # Tactics and analysis
-        'tactics', 'formation', 'strategy', 'game plan', 'system',
-        'press', 'possession', 'counter attack', 'build up'
-    ]
-    
     # Must contain at least one positive soccer keyword
-    return any(keyword in text_lower for keyword in good_keywords)
+    return GOOD_SOCCER_MATCHER.search(text) is not None
 
 def is_good_soccer_content(title, summary):
     """
@@ -213,6 +199,11 @@ CONTENT_TYPES = {
     }
 }
 
+PERSONA_MATCHERS = {
+    name: KeywordMatcher(persona.get("filter_keywords", []))
+    for name, persona in CONTENT_TYPES.items()
+}
+
 FLEXIBLE_PERSONAS = [name for name, config in CONTENT_TYPES.items() if config.get("flexible", True)]
 
 # =============================
@@ -233,21 +224,9 @@ def get_optimized_hashtags(persona_name):
 # =============================
 # HELPER FUNCTIONS
 # =============================
-def post_to_twitter(content):
-    try:
-        if len(content) > 280:
-            content = content[:277] + "..."
-        client_v2 = tweepy.Client(
-            consumer_key=TWITTER_API_KEY,
-            consumer_secret=TWITTER_API_SECRET,
-            access_token=TWITTER_ACCESS_TOKEN,
-            access_token_secret=TWITTER_ACCESS_TOKEN_SECRET
-        )
-        response = client_v2.create_tweet(text=content)
-        return bool(response and response.data)
-    except Exception as e:
-        print(f"Twitter post error: {e}")
-        return False
+def post_to_twitter(content, card_theme='foot1', source_url=None):
+    # Quote card in the persona's colours, attached at publish time
+    return publisher.post('foot1', content, url=source_url, card_theme=card_theme)
 
 def clean_html(text):
     if not text: return ""
@@ -257,12 +236,13 @@ def clean_html(text):
     return text.strip()
 
 def filter_for_persona(entry, persona_name):
-    title = entry['title'].lower()
-    summary = entry['summary'].lower()
+    title = entry.title_lower
+    summary = entry.summary_lower
     keywords = CONTENT_TYPES[persona_name].get("filter_keywords", [])
+    matcher = PERSONA_MATCHERS[persona_name]
     
     if persona_name == "cultural_historian":
-        if any(keyword in title or keyword in summary for keyword in keywords):
+        if matcher.search(title, summary):
             return True
         year_pattern = r'\b(19\d{2}|200\d|201[0-7])\b'
         if re.search(year_pattern, title) or re.search(year_pattern, summary):
@@ -270,7 +250,7 @@ def filter_for_persona(entry, persona_name):
         return False
     
     if keywords:
-        return any(keyword in title or keyword in summary for keyword in keywords)
+        return matcher.search(title, summary) is not None
     return True
 
 # =============================
@@ -278,20 +258,16 @@ def filter_for_persona(entry, persona_name):
 # =============================
 def parse_reddit_rss():
     entries = []
-    custom_headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-    feedparser.USER_AGENT = custom_headers['User-Agent']
     
-    feeds_tried = 0
-    for url in random.sample(REDDIT_RSS_FEEDS, len(REDDIT_RSS_FEEDS)):
-        feeds_tried += 1
+    # All subreddits come from one or two combined listings; the subreddits
+    # are put in random order afterwards
+    for url, feed in fetch_subreddit_feeds(REDDIT_RSS_FEEDS, per_subreddit=15, timeout=10):
         try:
             print(f"  Checking {url.split('/')[4]}...")
-            response = requests.get(url, headers=custom_headers, timeout=10)
-            feed = feedparser.parse(response.content)
-            
             found_in_feed = 0
+            posted = history.posted_urls(entry.get('link') for entry in feed.entries[:15])
             for entry in feed.entries[:15]:
-                if not hasattr(entry, 'link') or entry.link in posted_links:
+                if not hasattr(entry, 'link') or entry.link in posted:
                     continue
                 
                 title = clean_html(getattr(entry, 'title', ''))
@@ -301,24 +277,21 @@ def parse_reddit_rss():
                 if not is_good_soccer_content(title, summary):
                     continue
                 
-                entries.append({
-                    'title': title,
-                    'link': entry.link,
-                    'summary': summary[:200] if summary else ''
-                })
+                entries.append(Article(
+                    title,
+                    entry.link,
+                    summary[:200],
+                    subreddit=entry.get('subreddit')
+                ))
                 found_in_feed += 1
-                
-                if len(entries) >= 10:
-                    break
             
             print(f"    Found {found_in_feed} good entries")
-            if len(entries) >= 10:
-                break
                 
         except Exception:
             continue
     
-    return entries
+    # Busy subreddits fill the combined listing; take the top of each in turn
+    return balance_by_subreddit(entries, 10, shuffle=True)
 
 # =============================
 # STRICT TWEET GENERATION
@@ -330,7 +303,7 @@ def generate_natural_tweet(persona_name, entry):
     prompt = f"""Write ONLY the tweet text, nothing else.
 
 As a {persona['style']}, write a short 2-line tweet about this football topic:
-"{entry['title']}"
+"{entry.title}"
 
 REQUIREMENTS:
 - Sound like a real person having a casual conversation
@@ -344,18 +317,11 @@ REQUIREMENTS:
 Good examples from your style:
 {examples}
 
-Now write your tweet about "{entry['title'][:60]}...":"""
+Now write your tweet about "{entry.title[:60]}...":"""
     
     try:
-        response = client.models.generate_content(model=MODEL_NAME, contents=prompt)
-        if response and response.candidates:
-            text = ""
-            for part in response.candidates[0].content.parts:
-                if hasattr(part, "text") and part.text:
-                    text += part.text
-            
-            text = text.strip()
-            
+        text = llm.generate(prompt, model=MODEL_NAME)
+        if text:
             # Clean text
             prefixes_to_remove = [
                 r'^Tweet:\s*', r'^Here(?:.*?)tweet:\s*', r'^As a.*?:?\s*',
@@ -401,13 +367,13 @@ def generate_with_persona(persona_name, entries):
     
     matching_entries = [e for e in entries if filter_for_persona(e, persona_name)]
     if not matching_entries and persona.get("flexible", True):
-        matching_entries = [e for e in entries if e['link'] not in posted_links]
+        matching_entries = entries
     
     if not matching_entries:
-        return None, None
+        return None, None, None
     
     for entry in random.sample(matching_entries, min(3, len(matching_entries))):
-        print(f"  Content: {entry['title'][:70]}...")
+        print(f"  Content: {entry.title[:70]}...")
         tweet_text = generate_natural_tweet(persona_name, entry)
         
         if tweet_text:
@@ -415,10 +381,9 @@ def generate_with_persona(persona_name, entries):
             final_tweet = tweet_text + "\n\n" + hashtags
             
             if len(final_tweet) <= 280:
-                posted_links.add(entry['link'])
-                return final_tweet, persona_name
+                return final_tweet, persona_name, entry.link
     
-    return None, None
+    return None, None, None
 
 # =============================
 # MAIN GENERATION
@@ -429,22 +394,22 @@ def generate_tweet():
     
     if not entries:
         print("❌ No quality soccer content found")
-        return None, None
+        return None, None, None
     
     print(f"✓ Found {len(entries)} quality entries")
     print("  Best titles:")
     for i, entry in enumerate(entries[:3], 1):
-        print(f"    {i}. {entry['title'][:70]}...")
+        print(f"    {i}. {entry.title[:70]}...")
     
     # Try personas
     original_persona = random.choice(list(CONTENT_TYPES.keys()))
     print(f"\n🎯 Trying {original_persona.replace('_', ' ').title()}...")
     
-    tweet, used_persona = generate_with_persona(original_persona, entries)
+    tweet, used_persona, source_url = generate_with_persona(original_persona, entries)
     
     if tweet:
         print(f"  ✅ Generated quality tweet")
-        return tweet, used_persona
+        return tweet, used_persona, source_url
     
     # Try other personas
     print(f"\n🔄 Trying other personas...")
@@ -453,11 +418,11 @@ def generate_tweet():
             continue
         
         print(f"  Trying {persona_name.replace('_', ' ').title()}...")
-        tweet, used_persona = generate_with_persona(persona_name, entries)
+        tweet, used_persona, source_url = generate_with_persona(persona_name, entries)
         
         if tweet:
             print(f"    ✅ Success with adaptation")
-            return tweet, used_persona
+            return tweet, used_persona, source_url
     
     # Quality fallback
     print(f"\n⚡ Creating quality fallback tweet...")
@@ -473,7 +438,7 @@ def generate_tweet():
     hashtags = get_optimized_hashtags("fan_philosopher")
     tweet = tweet_text + "\n\n" + hashtags
     
-    return tweet, "fan_philosopher"
+    return tweet, "fan_philosopher", None
 
 # =============================
 # MAIN EXECUTION
@@ -495,7 +460,17 @@ def main():
     print("✓ Mode: AUTOMATED (no user input required)")
     print("✓ Hashtags: 2-3 optimized")
     
-    tweet, persona = generate_tweet()
+    # Stop before fetching feeds or calling Gemini when the account's
+    # tweet quota is used up
+    if not publisher.can_post():
+        return
+    
+    # A post an earlier run queued but couldn't publish goes out before
+    # anything new is generated
+    if publisher.resume('foot1'):
+        return
+    
+    tweet, persona, source_url = generate_tweet()
     
     if not tweet:
         print("\n❌ Could not generate quality tweet")
@@ -511,7 +486,8 @@ def main():
     
     # AUTOMATED POSTING - no user input
     print("\n📤 Auto-posting to Twitter...")
-    if post_to_twitter(tweet):
+    success = post_to_twitter(tweet, persona, source_url)
+    if success:
         print("✅ Posted successfully!")
     else:
         print("❌ Post failed")
@@ -1,11 +1,15 @@
+import heapq
 import os
-import requests
-import feedparser
-from datetime import datetime, timezone
+import time
 from dotenv import load_dotenv
 import re
 import json
-import tweepy
+
+import history
+import llm
+import publisher
+from articles import Article, entry_timestamp
+from feeds import fetch_feeds
 
 load_dotenv()
 
@@ -15,6 +19,7 @@ TWITTER_API_SECRET = os.getenv("TWITTER_API_SECRET")
 TWITTER_ACCESS_TOKEN = os.getenv("TWITTER_ACCESS_TOKEN")
 TWITTER_ACCESS_TOKEN_SECRET = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = "gemini-2.5-flash"
 
 # Gaming RSS feeds
 GAMING_RSS_FEEDS = [
@@ -30,6 +35,10 @@ GAMING_RSS_FEEDS = [
     "https://www.vg247.com/feed"
 ]
 
+# Freshest stories kept as candidates, and how recent they must be
+TOP_STORIES = 5
+RECENT_HOURS = 48
+
 # Gaming hashtags - FIXED: removed extra closing brace
 GAMING_HASHTAGS = {
     'playstation': ['#PlayStation', '#PS5', '#PS4', '#PlayStation5', '#Sony', '#Exclusive'],
@@ -46,99 +55,61 @@ GAMING_HASHTAGS = {
     'general': ['#GamingNews', '#VideoGames', '#Gamer', '#GamingCommunity', '#WhatsNew']
 }
 
-def post_to_twitter(content, image_url=None):
-    """Post content to Twitter"""
-    try:
-        print("🐦 Posting to Twitter...")
-        
-        # Twitter character limit
-        if len(content) > 280:
-            print(f"📏 Content too long ({len(content)} chars), truncating...")
-            content = content[:277] + "..."
-        
-        # Initialize Twitter API
-        client = tweepy.Client(
-            consumer_key=TWITTER_API_KEY,
-            consumer_secret=TWITTER_API_SECRET,
-            access_token=TWITTER_ACCESS_TOKEN,
-            access_token_secret=TWITTER_ACCESS_TOKEN_SECRET
-        )
-        
-        media_ids = []
-        
-        # Upload image if available
-        if image_url:
-            try:
-                auth = tweepy.OAuthHandler(TWITTER_API_KEY, TWITTER_API_SECRET)
-                auth.set_access_token(TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET)
-                api = tweepy.API(auth)
-                
-                # Download image
-                response = requests.get(image_url, timeout=10)
-                if response.status_code == 200:
-                    with open('/tmp/temp_image.jpg', 'wb') as f:
-                        f.write(response.content)
-                    
-                    # Upload to Twitter
-                    media = api.media_upload('/tmp/temp_image.jpg')
-                    media_ids.append(media.media_id_string)
-                    print(f"✅ Image uploaded: {image_url}")
-            except Exception as e:
-                print(f"⚠️ Failed to upload image: {e}")
-        
-        # Post tweet
-        if media_ids:
-            response = client.create_tweet(text=content, media_ids=media_ids)
-        else:
-            response = client.create_tweet(text=content)
-        
-        if response and response.data:
-            print(f"✅ Tweet posted successfully! ID: {response.data['id']}")
-            return True
-        else:
-            print("❌ Tweet failed")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Twitter error: {e}")
-        return False
+def post_to_twitter(content, image_url=None, source_url=None):
+    """Queue content in the outbox and post it to Twitter"""
+    print("🐦 Posting to Twitter...")
+    return publisher.post('gnews', content, url=source_url, image_urls=[image_url])
 
-def get_gaming_news():
-    """Fetch gaming news"""
-    all_entries = []
+def get_gaming_news(k=TOP_STORIES):
+    """
+    Fetch the `k` freshest recent, unposted gaming stories, newest first.
+    Entries are filtered as feeds arrive and only the best `k` are held in
+    a min-heap, so stale or posted entries never crowd out fresh ones and
+    nothing is sorted beyond the final `k`.
+    """
+    heap = []
+    sequence = 0
     
-    for rss_url in GAMING_RSS_FEEDS:
+    print(f"📰 Fetching {len(GAMING_RSS_FEEDS)} gaming feeds...")
+    for rss_url, feed in fetch_feeds(GAMING_RSS_FEEDS):
         try:
-            print(f"📰 Fetching from: {rss_url}")
-            feed = feedparser.parse(rss_url)
-            
             if feed.entries:
+                posted = history.posted_urls(entry.get('link') for entry in feed.entries)
+                source = rss_url.split('//')[1].split('/')[0]
                 for entry in feed.entries:
-                    # Skip if too old
-                    if not hasattr(entry, 'published_parsed'):
+                    # Skip if undated or too old
+                    published = entry_timestamp(entry)
+                    if not is_recent(published):
+                        continue
+                    
+                    # Skip if already posted
+                    if entry.get('link') in posted:
                         continue
                     
-                    entry.source = rss_url.split('//')[1].split('/')[0]
-                    all_entries.append(entry)
+                    # Older than everything kept, no need to look further at it
+                    if len(heap) == k and published <= heap[0][0]:
+                        continue
+                    
+                    # The sequence number breaks ties so entries are never compared
+                    item = (published, sequence, entry, source)
+                    sequence += 1
+                    if len(heap) < k:
+                        heapq.heappush(heap, item)
+                    else:
+                        heapq.heapreplace(heap, item)
                     
         except Exception as e:
             print(f"❌ Error: {rss_url}: {e}")
     
-    # Sort by date, newest first
-    all_entries.sort(key=lambda x: getattr(x, 'published_parsed', datetime(1970, 1, 1).timetuple()), reverse=True)
-    return all_entries[:5]
+    # Only the survivors are normalized, newest first
+    return [
+        Article.from_entry(entry, source=source, image_finder=extract_image)
+        for _, _, entry, source in sorted(heap, reverse=True)
+    ]
 
-def is_recent(entry, hours=48):
-    """Check if entry is recent"""
-    try:
-        if hasattr(entry, 'published_parsed'):
-            published = datetime(*entry.published_parsed[:6])
-            now = datetime.now(timezone.utc).replace(tzinfo=None)
-            diff = now - published
-            return diff.total_seconds() <= hours * 3600
-    except:
-        return False
-    return False
+def is_recent(published, hours=RECENT_HOURS):
+    """Check if a UTC epoch publish time is recent"""
+    return published is not None and time.time() - published <= hours * 3600
 
 def extract_image(entry):
     """Extract first image from entry"""
@@ -166,9 +137,9 @@ def extract_image(entry):
     
     return None
 
-def get_gaming_hashtags(title, description):
+def get_gaming_hashtags(article):
     """Get relevant hashtags"""
-    text = (title + " " + description).lower()
+    text = article.title_lower + " " + article.summary_lower
     hashtags = []
     
     # Check categories
@@ -208,11 +179,9 @@ Example format: "Breaking: New game announcement! 🎮 Looks amazing! What do yo
 
 Now create the tweet:"""
         
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1/models/gemini-2.5-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
+        response = llm.request(
+            {"contents": [{"parts": [{"text": prompt}]}]},
+            model=GEMINI_MODEL,
             timeout=30
         )
         
@@ -243,9 +212,18 @@ def main():
     
     print("✅ API keys loaded")
     
+    # Stop before fetching feeds or calling Gemini when the account's
+    # tweet quota is used up
+    if not publisher.can_post():
+        return
+    
+    # A post an earlier run queued but couldn't publish goes out before
+    # anything new is generated
+    if publisher.resume('gnews'):
+        return
+    
     # Get news
-    entries = get_gaming_news()
-    recent_entries = [e for e in entries if is_recent(e)]
+    recent_entries = get_gaming_news()
     
     if not recent_entries:
         print("❌ No recent news found")
@@ -256,17 +234,15 @@ def main():
     
     # Take first recent entry
     entry = recent_entries[0]
-    title = getattr(entry, 'title', 'Gaming News Update')
-    description = getattr(entry, 'summary', '') or getattr(entry, 'description', '')
-    
-    # Extract image
-    image_url = extract_image(entry)
+    title = entry.title or 'Gaming News Update'
+    description = entry.summary
+    image_url = entry.image_url
     
     # Generate tweet text
     tweet_text = generate_tweet_with_gemini(title, description)
     
     # Add hashtags
-    hashtags = get_gaming_hashtags(title, description)
+    hashtags = get_gaming_hashtags(entry)
     final_tweet = f"{tweet_text} {hashtags}"
     
     # Ensure within limit
@@ -278,7 +254,7 @@ def main():
     print(f"🖼️ Image: {'Yes' if image_url else 'No'}")
     
     # Post to Twitter
-    success = post_to_twitter(final_tweet, image_url)
+    success = post_to_twitter(final_tweet, image_url, entry.link)
     
     if success:
         print("\n✅ Bot completed successfully!")
@@ -0,0 +1,193 @@
+import hashlib
+import random
+import re
+import time
+from array import array
+
+from storage import connect
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Posts older than this are forgotten
+HISTORY_DAYS = 90
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    bot TEXT NOT NULL,
+    url TEXT,
+    tweet_id TEXT,
+    text TEXT,
+    posted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_url ON posts (url);
+CREATE INDEX IF NOT EXISTS posts_posted_at ON posts (posted_at);
+CREATE TABLE IF NOT EXISTS post_signatures (
+    post_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS post_bands (
+    band_key INTEGER NOT NULL,
+    post_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS post_bands_key ON post_bands (band_key);
+CREATE INDEX IF NOT EXISTS post_bands_post ON post_bands (post_id);
+"""
+
+# Estimated word-pair Jaccard similarity at which a new tweet counts as a
+# repeat of one already posted
+SIMILARITY_THRESHOLD = 0.6
+
+# MinHash signature size, split into LSH bands of BAND_ROWS values. Two tweets
+# become candidates when any band matches, which with 16 bands of 4 rows
+# catches nearly every pair above ~0.6 similarity and few below ~0.3.
+NUM_PERM = 64
+BAND_ROWS = 4
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+URL_RE = re.compile(r'https?://\S+')
+
+# ================================
+# POSTED HISTORY
+# ================================
+# Shared by every bot so a story tweeted by one run (or one bot) is not
+# picked again by the next.
+
+def _db():
+    return connect('history.db', SCHEMA)
+
+def posted_urls(urls):
+    """Return the subset of `urls` that has already been posted"""
+    urls = list({url for url in urls if url})
+    found = set()
+    # Stay well under SQLite's bound-parameter limit
+    for start in range(0, len(urls), 500):
+        chunk = urls[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        rows = _db().execute(f"SELECT url FROM posts WHERE url IN ({placeholders})", chunk)
+        found.update(row[0] for row in rows)
+    return found
+
+def is_posted(url):
+    """Check if a single URL has already been posted"""
+    return bool(url) and bool(posted_urls([url]))
+
+def record_post(bot, url, tweet_id, text):
+    """Remember a published tweet and forget anything past the retention window"""
+    db = _db()
+    with db:
+        cursor = db.execute(
+            "INSERT INTO posts (bot, url, tweet_id, text, posted_at) VALUES (?, ?, ?, ?, ?)",
+            (bot, url, str(tweet_id) if tweet_id else None, text, time.time())
+        )
+        _index(db, cursor.lastrowid, text)
+    prune()
+
+def prune(days=HISTORY_DAYS):
+    """Delete history entries older than `days`"""
+    db = _db()
+    cutoff = time.time() - days * 86400
+    with db:
+        old = "SELECT id FROM posts WHERE posted_at < ?"
+        db.execute(f"DELETE FROM post_bands WHERE post_id IN ({old})", (cutoff,))
+        db.execute(f"DELETE FROM post_signatures WHERE post_id IN ({old})", (cutoff,))
+        db.execute("DELETE FROM posts WHERE posted_at < ?", (cutoff,))
+
+# ================================
+# NEAR-DUPLICATE TWEETS
+# ================================
+# Different articles and fixed fallback pools still produce tweets that are
+# reworded copies of earlier ones. Every posted tweet gets a MinHash
+# signature over its word pairs, and LSH band keys index the signatures so a
+# candidate is only compared against tweets sharing a band, not the whole
+# history.
+
+_backfilled = False
+
+def shingles(text):
+    """Word pairs of a tweet, ignoring case, links, punctuation and emoji"""
+    words = WORD_RE.findall(URL_RE.sub(' ', (text or '').lower()))
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+def signature(text):
+    """MinHash signature of a tweet, or None when it has no words"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for shingle in shingles(text)
+    ]
+    if not hashes:
+        return None
+    return array('I', (min((a * h + b) % _MERSENNE for h in hashes) & 0xFFFFFFFF for a, b in _PERMUTATIONS))
+
+def _band_keys(sig):
+    """One signed 64-bit key per LSH band"""
+    keys = []
+    for band, start in enumerate(range(0, NUM_PERM, BAND_ROWS)):
+        data = bytes([band]) + sig[start:start + BAND_ROWS].tobytes()
+        keys.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big', signed=True))
+    return keys
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_PERM
+
+def _index(db, post_id, text):
+    sig = signature(text)
+    if sig is None:
+        return
+    db.execute("INSERT OR REPLACE INTO post_signatures (post_id, signature) VALUES (?, ?)", (post_id, sig.tobytes()))
+    db.executemany("INSERT INTO post_bands (band_key, post_id) VALUES (?, ?)", [(key, post_id) for key in _band_keys(sig)])
+
+def _backfill():
+    """Index posts recorded before the signature tables existed"""
+    global _backfilled
+    if _backfilled:
+        return
+    db = _db()
+    rows = db.execute(
+        "SELECT id, text FROM posts WHERE text IS NOT NULL AND id NOT IN (SELECT post_id FROM post_signatures)"
+    ).fetchall()
+    if rows:
+        with db:
+            for post_id, text in rows:
+                _index(db, post_id, text)
+    _backfilled = True
+
+def find_similar(text, threshold=SIMILARITY_THRESHOLD):
+    """
+    Closest earlier tweet at least `threshold` similar to `text`, as a dict
+    with 'bot', 'text', 'posted_at' and 'similarity', or None.
+    """
+    sig = signature(text)
+    if sig is None:
+        return None
+    _backfill()
+
+    keys = _band_keys(sig)
+    placeholders = ','.join('?' * len(keys))
+    rows = _db().execute(
+        f"""SELECT s.post_id, s.signature FROM post_signatures s
+            WHERE s.post_id IN (SELECT post_id FROM post_bands WHERE band_key IN ({placeholders}))""",
+        keys
+    ).fetchall()
+
+    best_id, best_score = None, threshold
+    for post_id, blob in rows:
+        score = similarity(sig, array('I', blob))
+        if score >= best_score:
+            best_id, best_score = post_id, score
+    if best_id is None:
+        return None
+
+    bot, previous, posted_at = _db().execute(
+        "SELECT bot, text, posted_at FROM posts WHERE id = ?", (best_id,)
+    ).fetchone()
+    return {'bot': bot, 'text': previous, 'posted_at': posted_at, 'similarity': best_score}
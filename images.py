@@ -0,0 +1,288 @@
+import io
+import mimetypes
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image, ImageFile, ImageOps
+
+import storage
+from feeds import get_session
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Bytes requested when probing an image; enough for the dimensions of
+# nearly every JPEG, PNG, GIF and WebP header
+PROBE_BYTES = 64 * 1024
+
+# Seconds a probe may take from request to last byte
+PROBE_TIMEOUT = 5
+
+# Candidates probed at once for one article
+MAX_PROBES = 4
+
+# Smaller images are icons, avatars or tracking pixels
+MIN_SIDE = 200
+
+# Twitter's upload limit for images
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+# Largest original worth downloading; normalization shrinks it well under
+# Twitter's limit
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+
+# Twitter's recommended size for a single timeline image; larger images are
+# scaled down to fit inside it
+TARGET_SIZE = (1200, 675)
+
+# Byte budget for a normalized image, and the JPEG qualities tried in turn
+# until it fits
+TARGET_BYTES = 1024 * 1024
+JPEG_QUALITIES = (85, 75, 65, 50)
+
+# Types Twitter accepts as they are, used when an image can't be normalized
+UPLOADABLE_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp'}
+
+# Seconds a full image download may take
+DOWNLOAD_TIMEOUT = 30
+
+# How long a probe result is trusted before the URL is checked again
+GOOD_TTL = 7 * 86400
+BAD_TTL = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_probes (
+    url TEXT PRIMARY KEY,
+    ok INTEGER NOT NULL,
+    content_type TEXT,
+    width INTEGER,
+    height INTEGER,
+    size INTEGER,
+    reason TEXT,
+    checked_at REAL NOT NULL
+);
+"""
+
+COLUMNS = ('url', 'ok', 'content_type', 'width', 'height', 'size', 'reason')
+
+# ================================
+# PROBE CACHE
+# ================================
+# Feeds keep pointing at the same images for days, and dead CDN links stay
+# dead, so probe results are remembered across runs.
+
+def _db():
+    return storage.connect('images.sqlite', SCHEMA)
+
+def _cached(url):
+    row = _db().execute(
+        f"SELECT {', '.join(COLUMNS)}, checked_at FROM image_probes WHERE url = ?", (url,)
+    ).fetchone()
+    if row is None:
+        return None
+    result = dict(zip(COLUMNS, row))
+    result['ok'] = bool(result['ok'])
+    ttl = GOOD_TTL if result['ok'] else BAD_TTL
+    return result if time.time() - row[-1] < ttl else None
+
+def _remember(result):
+    conn = _db()
+    conn.execute(
+        f"INSERT OR REPLACE INTO image_probes ({', '.join(COLUMNS)}, checked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        tuple(int(result[c]) if c == 'ok' else result[c] for c in COLUMNS) + (time.time(),)
+    )
+    conn.commit()
+
+# ================================
+# PROBING
+# ================================
+
+def _total_size(response):
+    """Full image size from Content-Range, or Content-Length on a plain 200"""
+    content_range = response.headers.get('Content-Range', '')
+    total = content_range.rpartition('/')[2]
+    if total.isdigit():
+        return int(total)
+    length = response.headers.get('Content-Length', '')
+    if response.status_code == 200 and length.isdigit():
+        return int(length)
+    return None
+
+def _dimensions(response, deadline):
+    """(width, height) parsed from the start of the body, or (None, None)"""
+    parser = ImageFile.Parser()
+    received = 0
+    try:
+        for chunk in response.iter_content(chunk_size=8 * 1024):
+            parser.feed(chunk)
+            if parser.image:
+                return parser.image.size
+            received += len(chunk)
+            if received >= PROBE_BYTES or time.monotonic() > deadline:
+                break
+    except Exception:
+        pass
+    return None, None
+
+def probe(url, timeout=PROBE_TIMEOUT):
+    """
+    Check an image URL with a ranged GET of its first bytes.
+    Returns a dict with 'url', 'ok', 'content_type', 'width', 'height',
+    'size' and 'reason' (why it was rejected). Answers are cached; network
+    errors are not, so a flaky host gets another chance next run.
+    """
+    cached = _cached(url)
+    if cached:
+        return cached
+
+    result = dict.fromkeys(COLUMNS)
+    result.update(url=url, ok=False)
+    deadline = time.monotonic() + timeout
+    try:
+        response = get_session().get(
+            url, headers={'Range': f"bytes=0-{PROBE_BYTES - 1}"}, timeout=timeout, stream=True
+        )
+    except Exception as e:
+        result['reason'] = f"{type(e).__name__}"
+        return result
+
+    with response:
+        result['content_type'] = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        result['size'] = _total_size(response)
+        if response.status_code not in (200, 206):
+            result['reason'] = f"HTTP {response.status_code}"
+        elif not result['content_type'].startswith('image/'):
+            result['reason'] = f"not an image ({result['content_type'] or 'no content type'})"
+        elif result['size'] and result['size'] > MAX_DOWNLOAD_BYTES:
+            result['reason'] = f"too large ({result['size']} bytes)"
+        else:
+            result['width'], result['height'] = _dimensions(response, deadline)
+            if result['width'] and min(result['width'], result['height']) < MIN_SIDE:
+                result['reason'] = f"too small ({result['width']}x{result['height']})"
+            else:
+                result['ok'] = True
+
+    if response.status_code == 429 or response.status_code >= 500:
+        # Throttled or broken right now, not necessarily for a day
+        return result
+    _remember(result)
+    return result
+
+def first_good_image(urls, limit=MAX_PROBES, timeout=PROBE_TIMEOUT):
+    """
+    Probe up to `limit` image URLs at once and return the probe result of
+    the first one that answers as a usable image, or None. Slower probes
+    are left to finish in the background.
+    """
+    urls = list(dict.fromkeys(url for url in urls if url))[:limit]
+    if not urls:
+        return None
+
+    pool = ThreadPoolExecutor(max_workers=len(urls))
+    try:
+        futures = [pool.submit(probe, url, timeout) for url in urls]
+        for future in as_completed(futures):
+            result = future.result()
+            if result['ok']:
+                return result
+            print(f"⚠️ Skipping image {result['url']}: {result['reason']}")
+        return None
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# ================================
+# DOWNLOADING
+# ================================
+# Images are streamed into memory and handed to tweepy as a file object,
+# so nothing is written to disk and concurrent bots can't overwrite each
+# other's downloads.
+
+def download(url, max_bytes=MAX_IMAGE_BYTES, timeout=DOWNLOAD_TIMEOUT):
+    """
+    Stream an image into a BytesIO, giving up as soon as it passes
+    `max_bytes` or takes longer than `timeout` seconds. Returns
+    (buffer, content_type).
+    """
+    deadline = time.monotonic() + timeout
+    with get_session().get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        length = response.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > max_bytes:
+            raise ValueError(f"image too large ({length} bytes)")
+
+        buffer = io.BytesIO()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            buffer.write(chunk)
+            if buffer.tell() > max_bytes:
+                raise ValueError(f"image larger than {max_bytes} bytes")
+            if time.monotonic() > deadline:
+                raise TimeoutError("image download exceeded timeout")
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+
+    buffer.seek(0)
+    return buffer, content_type
+
+# ================================
+# NORMALIZATION
+# ================================
+# Feed images arrive as 4000px JPEGs, huge PNGs, WebP or AVIF. Re-encoding
+# them as a progressive JPEG inside Twitter's recommended size keeps
+# uploads small and fast and stops oversized originals from being dropped.
+
+def normalize(buffer, size=TARGET_SIZE, max_bytes=TARGET_BYTES):
+    """
+    Re-encode an image as a progressive JPEG that fits inside `size`, with
+    EXIF and other metadata stripped, at the best quality that stays under
+    `max_bytes`. Returns a BytesIO, or None for animated images, which
+    would lose their animation.
+    """
+    image = Image.open(buffer)
+    if getattr(image, 'is_animated', False):
+        return None
+
+    # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale, far faster than a full
+    # decode followed by a resize
+    image.draft('RGB', size)
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail(size, Image.LANCZOS)
+
+    for quality in JPEG_QUALITIES:
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+        if output.tell() <= max_bytes:
+            break
+    output.seek(0)
+    return output
+
+def upload(api, url, timeout=DOWNLOAD_TIMEOUT):
+    """Download, normalize and upload an image with a tweepy v1.1 API; returns the media id string"""
+    buffer, content_type = download(url, max_bytes=MAX_DOWNLOAD_BYTES, timeout=timeout)
+    original_size = len(buffer.getbuffer())
+
+    try:
+        normalized = normalize(buffer)
+    except Exception as e:
+        print(f"⚠️ Could not normalize image ({e}), uploading the original")
+        normalized = None
+
+    if normalized is not None:
+        print(f"🖼️ Normalized image: {original_size} -> {len(normalized.getbuffer())} bytes")
+        buffer, extension = normalized, '.jpg'
+    else:
+        if content_type not in UPLOADABLE_TYPES or original_size > MAX_IMAGE_BYTES:
+            raise ValueError(f"can't upload {content_type or 'unknown type'} image of {original_size} bytes")
+        buffer.seek(0)
+        # tweepy sniffs the type from the bytes and only falls back to the name
+        extension = mimetypes.guess_extension(content_type)
+
+    media = api.media_upload(filename=f"image{extension or '.jpg'}", file=buffer)
+    return media.media_id_string
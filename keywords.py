@@ -0,0 +1,92 @@
+import re
+
+# ================================
+# COMPILED KEYWORD MATCHING
+# ================================
+# A keyword list is folded into a character trie and emitted as a single
+# regex (e.g. 'sponsor', 'sponsored', 'spam' -> 'sp(?:am|onsor(?:ed)?)'),
+# so a text is scanned once no matter how many keywords the list holds.
+
+def _trie_regex(node):
+    """Regex for the keywords below a trie node, longest alternatives first"""
+    branches = [re.escape(char) + _trie_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    if '' in node:
+        # A keyword ends here, the longer ones are optional
+        return '(?:' + '|'.join(branches) + ')?'
+    return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+class KeywordMatcher:
+    """
+    Case-insensitive matcher for a fixed set of keywords, compiled once.
+    Matches substrings like `keyword in text.lower()` does, or only whole
+    words with whole_words=True.
+    """
+
+    def __init__(self, keywords, whole_words=False):
+        self.keywords = sorted({k.lower() for k in keywords if k})
+        self.whole_words = whole_words
+
+        trie = {}
+        for keyword in self.keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        body = _trie_regex(trie) if self.keywords else '(?!)'
+
+        if whole_words:
+            self._first = re.compile(rf'(?<!\w)(?:{body})(?!\w)', re.IGNORECASE)
+            self._every = re.compile(rf'(?<!\w)(?=((?:{body})(?!\w)))', re.IGNORECASE)
+        else:
+            self._first = re.compile(body, re.IGNORECASE)
+            self._every = re.compile(rf'(?=({body}))', re.IGNORECASE)
+
+        # Keywords that are prefixes of another keyword, found via the longer match
+        keyword_set = set(self.keywords)
+        self._prefixes = {
+            keyword: [keyword[:i] for i in range(1, len(keyword)) if keyword[:i] in keyword_set]
+            for keyword in self.keywords
+        }
+
+    def _keyword(self, matched):
+        """
+        The listed keyword a matched string stands for. IGNORECASE also
+        matches characters whose lower() differs, like 'ſ' for 's' and 'İ'
+        for 'i', but always one character for one, so lengths agree.
+        """
+        keyword = matched.lower()
+        if keyword in self._prefixes:
+            return keyword
+        return next(
+            k for k in self.keywords
+            if len(k) == len(matched) and re.fullmatch(re.escape(k), matched, re.IGNORECASE)
+        )
+
+    def search(self, *texts):
+        """First keyword found in any of the texts, or None"""
+        for text in texts:
+            if text:
+                match = self._first.search(text)
+                if match:
+                    return self._keyword(match.group(0))
+        return None
+
+    def findall(self, *texts):
+        """Set of every keyword occurring in the texts, overlapping ones included"""
+        found = set()
+        for text in texts:
+            if not text:
+                continue
+            for match in self._every.finditer(text):
+                keyword = self._keyword(match.group(1))
+                found.add(keyword)
+                for prefix in self._prefixes[keyword]:
+                    end = match.start() + len(prefix)
+                    if not self.whole_words or end == len(text) or not _is_word_char(text[end]):
+                        found.add(prefix)
+        return found
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import llm_cache
+
+# ================================
+# CONFIGURATION
+# ================================
+
+API_BASE = "https://generativelanguage.googleapis.com"
+
+# Model used when a caller doesn't name one
+DEFAULT_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash')
+
+# Seconds a single request may take
+DEFAULT_TIMEOUT = float(os.environ.get('GEMINI_TIMEOUT', '30'))
+
+# Extra attempts after a rate limit, server error or network failure
+MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', '3'))
+
+# Backoff before retry n is a random delay in [0, min(BACKOFF_MAX, BACKOFF_BASE * 2**n)]
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Keep-alive connections held open to the API
+POOL_SIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+# ================================
+# HELPERS
+# ================================
+
+def get_session():
+    """Shared keep-alive session for Gemini requests"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.headers['Content-Type'] = 'application/json'
+            _session = session
+    return _session
+
+def _backoff(attempt, response=None):
+    """Seconds to wait before retrying, honouring Retry-After when given"""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(BACKOFF_MAX, float(retry_after))
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def text_of(data):
+    """Concatenated text of the first candidate in a generateContent reply"""
+    candidates = data.get('candidates') or []
+    if not candidates:
+        return ''
+    parts = candidates[0].get('content', {}).get('parts') or []
+    return ''.join(part.get('text', '') for part in parts).strip()
+
+def texts_of(data):
+    """Text of every candidate in a generateContent reply, in order"""
+    texts = []
+    for candidate in data.get('candidates') or []:
+        parts = candidate.get('content', {}).get('parts') or []
+        texts.append(''.join(part.get('text', '') for part in parts).strip())
+    return texts
+
+# ================================
+# REQUESTS
+# ================================
+
+def request(body, model=None, api_version='v1', timeout=None, max_retries=None):
+    """
+    POST a generateContent body and return the final requests.Response.
+    429 and 5xx replies and network errors are retried with jittered
+    exponential backoff; the last response (or exception) is passed on
+    to the caller once retries run out.
+    """
+    url = f"{API_BASE}/{api_version}/models/{model or DEFAULT_MODEL}:generateContent"
+    timeout = timeout or DEFAULT_TIMEOUT
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+
+    for attempt in range(max_retries + 1):
+        last_try = attempt == max_retries
+        try:
+            response = get_session().post(
+                url,
+                params={"key": os.environ.get('GEMINI_API_KEY')},
+                json=body,
+                timeout=timeout
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if last_try:
+                raise
+            delay = _backoff(attempt)
+            print(f"⚠️ Gemini request failed ({type(e).__name__}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            continue
+
+        if response.status_code not in RETRY_STATUSES or last_try:
+            return response
+        delay = _backoff(attempt, response)
+        print(f"⚠️ Gemini returned {response.status_code}, retrying in {delay:.1f}s...")
+        time.sleep(delay)
+
+def generate(prompt, model=None, api_version='v1', timeout=None, generation_config=None, max_retries=None, cache=None):
+    """
+    Generate text for a prompt. Returns the text, or None on any failure.
+    Passing a call kind as `cache` (e.g. 'hashtags') serves repeated
+    prompts from the on-disk response cache for that kind's TTL.
+    """
+    model = model or DEFAULT_MODEL
+    if cache:
+        key = llm_cache.make_key(model, prompt, api_version, generation_config)
+        try:
+            cached = llm_cache.get(key)
+        except Exception as e:
+            print(f"⚠️ LLM cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            return cached
+
+    body = {"contents": [{"parts": [{"text": prompt}]}]}
+    if generation_config:
+        body["generationConfig"] = generation_config
+
+    try:
+        response = request(body, model, api_version, timeout, max_retries)
+    except Exception as e:
+        print(f"❌ Gemini request error: {type(e).__name__}: {e}")
+        return None
+
+    if response.status_code != 200:
+        print(f"❌ Gemini API error {response.status_code}: {response.text[:200]}")
+        return None
+
+    try:
+        text = text_of(response.json()) or None
+    except Exception as e:
+        print(f"❌ Unexpected Gemini response: {e}")
+        return None
+
+    if cache and text:
+        try:
+            llm_cache.put(key, cache, text)
+        except Exception as e:
+            print(f"⚠️ LLM cache write failed: {e}")
+    return text
+
+# ================================
+# ASYNC
+# ================================
+# The blocking calls run in worker threads and share the same pool.
+
+async def arequest(body, model=None, api_version='v1', timeout=None, max_retries=None):
+    """Async version of request()"""
+    return await asyncio.to_thread(request, body, model, api_version, timeout, max_retries)
+
+async def agenerate(prompt, model=None, api_version='v1', timeout=None, generation_config=None, max_retries=None, cache=None):
+    """Async version of generate()"""
+    return await asyncio.to_thread(generate, prompt, model, api_version, timeout, generation_config, max_retries, cache)
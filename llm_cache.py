@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import time
+
+import storage
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Seconds a cached reply stays valid, per kind of call
+CACHE_TTLS = {
+    'hashtags': 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+# Least recently used replies are evicted past either bound
+MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '5000'))
+MAX_BYTES = int(os.environ.get('LLM_CACHE_MAX_BYTES', str(5 * 1024 * 1024)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+"""
+
+# ================================
+# ON-DISK RESPONSE CACHE
+# ================================
+# Replies are keyed by model, endpoint version, generation config and the
+# whitespace-normalized prompt, so a reworded indent or trailing newline in
+# a prompt template still hits.
+
+def _db():
+    return storage.connect('llm_cache.sqlite', SCHEMA)
+
+def make_key(model, prompt, api_version='v1', generation_config=None):
+    """Cache key for a generateContent call"""
+    normalized = ' '.join(prompt.split())
+    payload = json.dumps([model, api_version, generation_config, normalized], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get(key):
+    """Cached reply for a key, or None if missing or expired"""
+    now = time.time()
+    conn = _db()
+    row = conn.execute(
+        "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+    ).fetchone()
+    if row is None:
+        return None
+    conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+    conn.commit()
+    return row[0]
+
+def put(key, kind, value):
+    """Store a reply and evict expired and least recently used entries"""
+    now = time.time()
+    ttl = CACHE_TTLS.get(kind, DEFAULT_TTL)
+    conn = _db()
+    conn.execute(
+        "INSERT OR REPLACE INTO responses (key, kind, value, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+        (key, kind, value, now + ttl, now)
+    )
+    evict(conn, now)
+    conn.commit()
+
+def evict(conn, now=None):
+    """Drop expired entries, then the oldest ones until both bounds are met"""
+    conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now or time.time(),))
+    count, total = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM responses"
+    ).fetchone()
+    if count <= MAX_ENTRIES and total <= MAX_BYTES:
+        return
+
+    stale = []
+    for key, size in conn.execute("SELECT key, LENGTH(value) FROM responses ORDER BY last_used"):
+        if count <= MAX_ENTRIES and total <= MAX_BYTES:
+            break
+        stale.append((key,))
+        count -= 1
+        total -= size
+    conn.executemany("DELETE FROM responses WHERE key = ?", stale)
@@ -1,14 +1,16 @@
 import os
-import requests
 import random
-import time
 import json
-import feedparser
-from datetime import datetime
 import pytrends
 from pytrends.request import TrendReq
 import re
-import tweepy
+
+import history
+import llm
+import publisher
+from articles import Article, feed_source
+from feeds import fetch_feeds
+from keywords import KeywordMatcher
 
 # ================================
 # CONFIGURATION
@@ -20,6 +22,7 @@ TWITTER_API_SECRET = os.environ.get('TWITTER_API_SECRET')
 TWITTER_ACCESS_TOKEN = os.environ.get('TWITTER_ACCESS_TOKEN')
 TWITTER_ACCESS_TOKEN_SECRET = os.environ.get('TWITTER_ACCESS_TOKEN_SECRET')
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+GEMINI_MODEL = 'gemini-2.0-flash'
 
 # Curated RSS Feeds - Only quality sources
 TECH_RSS_FEEDS = [
@@ -47,6 +50,20 @@ PROMOTIONAL_KEYWORDS = [
     'promotion', 'bundle', 'free trial', 'subscribe', 'sign up', 'get started'
 ]
 
+# Positive indicators of genuine tech/game dev content
+QUALITY_INDICATORS = [
+    'analysis', 'review', 'guide', 'tutorial', 'news', 'update',
+    'release', 'development', 'design', 'programming', 'engine',
+    'studio', 'developer', 'industry', 'trend', 'future', 'ai',
+    'technology', 'innovation', 'research', 'study', 'report',
+    'interview', 'behind the scenes', 'post-mortem', 'case study'
+]
+
+# Keyword lists compiled once for the content filters
+PROMOTIONAL_MATCHER = KeywordMatcher(PROMOTIONAL_KEYWORDS)
+QUALITY_MATCHER = KeywordMatcher(QUALITY_INDICATORS)
+PRICE_MATCHER = KeywordMatcher(['% off', '$', '€', '£'])
+
 # Poll templates for better formatting
 POLL_TEMPLATES = {
     'game_design': [
@@ -91,22 +108,14 @@ POLL_TEMPLATES = {
 
 def is_promotional_content(article):
     """Check if article contains promotional content"""
-    title = article.get('title', '').lower()
-    summary = article.get('summary', '').lower()
-    
-    # Check for promotional keywords
-    for keyword in PROMOTIONAL_KEYWORDS:
-        if keyword in title or keyword in summary:
-            print(f"🚫 Filtered out promotional content: {keyword}")
-            return True
-    
-    # Check for sponsored indicators
-    if 'sponsored' in title or 'sponsored' in summary:
-        print(f"🚫 Filtered out sponsored content")
+    # Check for promotional keywords (including 'sponsored')
+    keyword = PROMOTIONAL_MATCHER.search(article.title_lower, article.summary_lower)
+    if keyword:
+        print(f"🚫 Filtered out promotional content: {keyword}")
         return True
     
     # Check for sales/discount language
-    if any(word in title for word in ['% off', '$', '€', '£']):
+    if PRICE_MATCHER.search(article.title_lower):
         print(f"🚫 Filtered out price/discount content")
         return True
     
@@ -114,20 +123,7 @@ def is_promotional_content(article):
 
 def is_quality_content(article):
     """Check if article is genuine tech/game dev content"""
-    title = article.get('title', '').lower()
-    
-    # Positive indicators of quality content
-    quality_indicators = [
-        'analysis', 'review', 'guide', 'tutorial', 'news', 'update',
-        'release', 'development', 'design', 'programming', 'engine',
-        'studio', 'developer', 'industry', 'trend', 'future', 'ai',
-        'technology', 'innovation', 'research', 'study', 'report',
-        'interview', 'behind the scenes', 'post-mortem', 'case study'
-    ]
-    
-    # Count quality indicators
-    quality_score = sum(1 for indicator in quality_indicators if indicator in title)
-    return quality_score > 0
+    return QUALITY_MATCHER.search(article.title_lower) is not None
 
 def filter_articles(articles):
     """Filter out promotional and low-quality articles"""
@@ -137,7 +133,7 @@ def filter_articles(articles):
         if not is_promotional_content(article) and is_quality_content(article):
             filtered_articles.append(article)
         else:
-            print(f"🚫 Filtered out: {article['title'][:60]}...")
+            print(f"🚫 Filtered out: {article.title[:60]}...")
     
     print(f"✅ Filtered {len(articles)} -> {len(filtered_articles)} quality articles")
     return filtered_articles
@@ -146,72 +142,13 @@ def filter_articles(articles):
 # TWITTER/X API FUNCTIONS
 # ================================
 
-def post_to_twitter(content, api_key, api_secret, access_token, access_token_secret, image_url=None):
-    """Post content to Twitter/X with optional image using the correct API versions"""
-    try:
-        print("🐦 Posting to Twitter/X...")
-        
-        # Ensure content is within Twitter limits
-        if len(content) > 280:
-            print(f"📏 Content too long ({len(content)} chars), truncating...")
-            content = content[:277] + "..."
-        
-        # --- UPLOAD MEDIA (using v1.1) ---
-        media_ids = []
-        if image_url:
-            print(f"📤 Uploading media from {image_url}...")
-            
-            # Use v1.1 API for media upload (this is allowed on Free tier)
-            auth_v1 = tweepy.OAuthHandler(api_key, api_secret)
-            auth_v1.set_access_token(access_token, access_token_secret)
-            api_v1 = tweepy.API(auth_v1)
-            
-            # Download image and upload
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            # Save temporarily
-            temp_file = "/tmp/tweet_image.jpg"
-            with open(temp_file, "wb") as f:
-                f.write(response.content)
-            
-            media = api_v1.media_upload(filename=temp_file)
-            media_ids.append(media.media_id_string)
-            
-            # Clean up
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-                
-            print(f"✅ Media uploaded successfully! ID: {media.media_id_string}")
-        
-        # --- CREATE TWEET (using v2) ---
-        client_v2 = tweepy.Client(
-            consumer_key=api_key,
-            consumer_secret=api_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret
-        )
-        
-        # Post the tweet using v2 endpoint
-        if media_ids:
-            response = client_v2.create_tweet(text=content, media_ids=media_ids)
-        else:
-            response = client_v2.create_tweet(text=content)
-        
-        if response and response.data:
-            tweet_id = response.data['id']
-            print(f"🎉 Successfully tweeted! Tweet ID: {tweet_id}")
-            return True
-        else:
-            print("❌ Twitter post failed: No response data")
-            return False
-            
-    except tweepy.TweepyException as e:
-        print(f"❌ Twitter API error: {e}")
-        return False
-    except Exception as e:
-        print(f"💥 Twitter post error: {e}")
-        return False
+def post_to_twitter(content, api_key, api_secret, access_token, access_token_secret, image_url=None, source_url=None):
+    """Queue content in the outbox and post it to Twitter/X with an optional image"""
+    print("🐦 Posting to Twitter/X...")
+    return publisher.post(
+        'post1', content, url=source_url, image_urls=[image_url],
+        credentials=(api_key, api_secret, access_token, access_token_secret)
+    )
 
 # ================================
 # CONTENT GENERATION FUNCTIONS
@@ -255,42 +192,34 @@ def fetch_news_from_feeds(feed_list, category):
     """Generic function to fetch news from RSS feeds"""
     all_articles = []
     
-    for rss_url in feed_list:
+    for rss_url, feed in fetch_feeds(feed_list):
         try:
-            feed = feedparser.parse(rss_url)
-            
             if not feed.entries:
                 continue
             
             for entry in feed.entries[:5]:  # Get more entries to filter from
-                article_date = None
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    article_date = datetime(*entry.published_parsed[:6])
+                article = Article.from_entry(
+                    entry,
+                    source=feed_source(feed, rss_url),
+                    category=category,
+                    image_finder=extract_image_from_entry
+                )
                 
                 # Skip if article is too old
-                if article_date and (datetime.now() - article_date).days > 3:
+                age = article.age()
+                if age is not None and age >= 4 * 86400:
                     continue
                 
-                # Extract image from entry
-                image_url = extract_image_from_entry(entry)
-                
-                article = {
-                    'title': entry.title,
-                    'link': entry.link,
-                    'summary': entry.summary if hasattr(entry, 'summary') else '',
-                    'published': article_date,
-                    'source': feed.feed.title if hasattr(feed.feed, 'title') else rss_url.split('//')[-1].split('/')[0],
-                    'category': category,
-                    'image_url': image_url
-                }
                 all_articles.append(article)
             
-            time.sleep(0.5)
-            
         except Exception as e:
             print(f"⚠️ Error parsing {rss_url}: {e}")
             continue
     
+    # Skip stories we've already posted about
+    posted = history.posted_urls(article.link for article in all_articles)
+    all_articles = [article for article in all_articles if article.link not in posted]
+    
     print(f"✅ Found {len(all_articles)} recent {category} articles")
     return all_articles
 
@@ -370,25 +299,11 @@ def generate_hashtags(topic, content_type):
     Make them feel current and relevant to genuine content.
     """
     
-    try:
-        # Updated for Gemini 2.0 Flash
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if "candidates" in data and data["candidates"]:
-                hashtags = data["candidates"][0]["content"]["parts"][0]["text"].strip()
-                hashtags = hashtags.replace('```', '').strip()
-                print(f"🏷️ AI-generated hashtags: {hashtags}")
-                return hashtags
-    except Exception as e:
-        print(f"❌ Hashtag generation error: {e}")
+    hashtags = llm.generate(prompt, model=GEMINI_MODEL, timeout=30, cache='hashtags')
+    if hashtags:
+        hashtags = hashtags.replace('```', '').strip()
+        print(f"🏷️ AI-generated hashtags: {hashtags}")
+        return hashtags
     
     # Fallback hashtags
     if content_type == 'tech':
@@ -401,17 +316,17 @@ def generate_hashtags(topic, content_type):
 def generate_tech_analysis_post(articles):
     """Generate sophisticated tech analysis post - ONLY QUALITY CONTENT"""
     if not articles:
-        return create_fallback_post('tech'), None
+        return create_fallback_post('tech'), None, None
     
     # RANDOM SELECTION: Pick from filtered quality articles
     selected_articles = random.sample(articles, min(2, len(articles)))
-    main_topic = selected_articles[0]['title']
+    main_topic = selected_articles[0].title
     
     # Try to find an article with an image
     image_url = None
     for article in selected_articles:
-        if article.get('image_url'):
-            image_url = article['image_url']
+        if article.image_url:
+            image_url = article.image_url
             break
     
     prompt = f"""
@@ -440,22 +355,22 @@ def generate_tech_analysis_post(articles):
     """
     
     post_text = generate_ai_content(prompt, selected_articles, 'tech', main_topic)
-    return post_text, image_url
+    return post_text, image_url, selected_articles[0].link
 
 def generate_game_dev_post(articles):
     """Generate sophisticated game development post - ONLY QUALITY CONTENT"""
     if not articles:
-        return create_fallback_post('game dev'), None
+        return create_fallback_post('game dev'), None, None
     
     # RANDOM SELECTION: Pick from filtered quality articles
     selected_articles = random.sample(articles, min(2, len(articles)))
-    main_topic = selected_articles[0]['title']
+    main_topic = selected_articles[0].title
     
     # Try to find an article with an image
     image_url = None
     for article in selected_articles:
-        if article.get('image_url'):
-            image_url = article['image_url']
+        if article.image_url:
+            image_url = article.image_url
             break
     
     prompt = f"""
@@ -484,12 +399,12 @@ def generate_game_dev_post(articles):
     """
     
     post_text = generate_ai_content(prompt, selected_articles, 'game dev', main_topic)
-    return post_text, image_url
+    return post_text, image_url, selected_articles[0].link
 
 def generate_trending_topic_post(trends):
     """Generate post about trending topics"""
     if not trends:
-        return create_fallback_post('trending'), None
+        return create_fallback_post('trending'), None, None
     
     main_topic = trends[0]
     
@@ -518,7 +433,7 @@ def generate_trending_topic_post(trends):
     """
     
     post_text = generate_ai_content(prompt, trends, 'trending', main_topic)
-    return post_text, None
+    return post_text, None, None
 
 def generate_trend_based_opinion_poll(trends):
     """Generate opinion poll post based on trending topics"""
@@ -561,11 +476,9 @@ def generate_ai_content(prompt, content, content_type, main_topic):
         print(f"🎭 Generating {content_type} post...")
         
         # Updated for Gemini 2.0 Flash
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
+        response = llm.request(
+            {"contents": [{"parts": [{"text": prompt}]}]},
+            model=GEMINI_MODEL,
             timeout=30
         )
         
@@ -695,23 +608,34 @@ def main():
     print(f"✅ Gemini 2.0 Flash configured")
     print("")
     
+    # Stop before fetching feeds or calling Gemini when the account's
+    # tweet quota is used up
+    if not publisher.can_post():
+        return
+    
+    # A post an earlier run queued but couldn't publish goes out before
+    # anything new is generated
+    if publisher.resume('post1'):
+        return
+    
     # Select post type
     post_type = select_post_type()
     print(f"🎯 Selected post type: {post_type.replace('_', ' ').title()}")
     
     # Gather content based on post type
     image_url = None
+    source_url = None
     if post_type == 'tech':
         articles = fetch_tech_news_from_rss()
-        post_text, image_url = generate_tech_analysis_post(articles)
+        post_text, image_url, source_url = generate_tech_analysis_post(articles)
         
     elif post_type == 'game_dev':
         articles = fetch_game_dev_news_from_rss()
-        post_text, image_url = generate_game_dev_post(articles)
+        post_text, image_url, source_url = generate_game_dev_post(articles)
         
     elif post_type == 'trending':
         trends = get_google_trends_topics()
-        post_text, image_url = generate_trending_topic_post(trends)
+        post_text, image_url, source_url = generate_trending_topic_post(trends)
         
     else:  # opinion_poll
         trends = get_google_trends_topics()
@@ -730,7 +654,8 @@ def main():
         TWITTER_API_SECRET, 
         TWITTER_ACCESS_TOKEN, 
         TWITTER_ACCESS_TOKEN_SECRET,
-        image_url
+        image_url,
+        source_url
     )
     
     if success:
@@ -1,14 +1,19 @@
 import os
-import requests
 import random
-import time
 import json
-import feedparser
 from datetime import datetime
 import pytrends
 from pytrends.request import TrendReq
 import re
-import tweepy
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import history
+import llm
+import publisher
+from articles import Article, feed_source
+from feeds import fetch_feeds
+from keywords import KeywordMatcher
 
 # ================================
 # CONFIGURATION
@@ -20,6 +25,15 @@ TWITTER_API_SECRET = os.environ.get('TWITTER_API_SECRET')
 TWITTER_ACCESS_TOKEN = os.environ.get('TWITTER_ACCESS_TOKEN')
 TWITTER_ACCESS_TOKEN_SECRET = os.environ.get('TWITTER_ACCESS_TOKEN_SECRET')
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+GEMINI_MODEL = 'gemini-2.0-flash'
+
+# Ask for post text, hashtags, CTA and quality check in one Gemini call
+# (set COMBINED_GENERATION=false to use the separate calls)
+COMBINED_GENERATION = os.environ.get('COMBINED_GENERATION', 'true').lower() != 'false'
+
+# Post candidates generated in one request and checked in parallel
+# (1 = one at a time with retries)
+CANDIDATE_COUNT = int(os.environ.get('CANDIDATE_COUNT', '3'))
 
 # Curated RSS Feeds - Only quality sources
 TECH_RSS_FEEDS = [
@@ -47,6 +61,20 @@ PROMOTIONAL_KEYWORDS = [
     'promotion', 'bundle', 'free trial', 'subscribe', 'sign up', 'get started'
 ]
 
+# Positive indicators of genuine tech/game dev content
+QUALITY_INDICATORS = [
+    'analysis', 'review', 'guide', 'tutorial', 'news', 'update',
+    'release', 'development', 'design', 'programming', 'engine',
+    'studio', 'developer', 'industry', 'trend', 'future', 'ai',
+    'technology', 'innovation', 'research', 'study', 'report',
+    'interview', 'behind the scenes', 'post-mortem', 'case study'
+]
+
+# Keyword lists compiled once for the content filters
+PROMOTIONAL_MATCHER = KeywordMatcher(PROMOTIONAL_KEYWORDS)
+QUALITY_MATCHER = KeywordMatcher(QUALITY_INDICATORS)
+PRICE_MATCHER = KeywordMatcher(['% off', '$', '€', '£'])
+
 # Post styles for variety - updated for friendly tone
 POST_STYLES = [
     "friendly_enthusiast",
@@ -154,22 +182,14 @@ def get_occasion_mood(occasion):
 
 def is_promotional_content(article):
     """Check if article contains promotional content"""
-    title = article.get('title', '').lower()
-    summary = article.get('summary', '').lower()
-    
-    # Check for promotional keywords
-    for keyword in PROMOTIONAL_KEYWORDS:
-        if keyword in title or keyword in summary:
-            print(f"🚫 Filtered out promotional content: {keyword}")
-            return True
-    
-    # Check for sponsored indicators
-    if 'sponsored' in title or 'sponsored' in summary:
-        print(f"🚫 Filtered out sponsored content")
+    # Check for promotional keywords (including 'sponsored')
+    keyword = PROMOTIONAL_MATCHER.search(article.title_lower, article.summary_lower)
+    if keyword:
+        print(f"🚫 Filtered out promotional content: {keyword}")
         return True
     
     # Check for sales/discount language
-    if any(word in title for word in ['% off', '$', '€', '£']):
+    if PRICE_MATCHER.search(article.title_lower):
         print(f"🚫 Filtered out price/discount content")
         return True
     
@@ -177,20 +197,7 @@ def is_promotional_content(article):
 
 def is_quality_content(article):
     """Check if article is genuine tech/game dev content"""
-    title = article.get('title', '').lower()
-    
-    # Positive indicators of quality content
-    quality_indicators = [
-        'analysis', 'review', 'guide', 'tutorial', 'news', 'update',
-        'release', 'development', 'design', 'programming', 'engine',
-        'studio', 'developer', 'industry', 'trend', 'future', 'ai',
-        'technology', 'innovation', 'research', 'study', 'report',
-        'interview', 'behind the scenes', 'post-mortem', 'case study'
-    ]
-    
-    # Count quality indicators
-    quality_score = sum(1 for indicator in quality_indicators if indicator in title)
-    return quality_score > 0
+    return QUALITY_MATCHER.search(article.title_lower) is not None
 
 def filter_articles(articles):
     """Filter out promotional and low-quality articles"""
@@ -200,7 +207,7 @@ def filter_articles(articles):
         if not is_promotional_content(article) and is_quality_content(article):
             filtered_articles.append(article)
         else:
-            print(f"🚫 Filtered out: {article['title'][:60]}...")
+            print(f"🚫 Filtered out: {article.title[:60]}...")
     
     print(f"✅ Filtered {len(articles)} -> {len(filtered_articles)} quality articles")
     return filtered_articles
@@ -209,84 +216,16 @@ def filter_articles(articles):
 # TWITTER/X API FUNCTIONS
 # ================================
 
-def post_to_twitter(content, api_key, api_secret, access_token, access_token_secret, image_url=None):
-    """Post content to Twitter/X with optional image using the correct API versions"""
-    try:
-        print("🐦 Posting to Twitter/X...")
-        
-        # Ensure content is within Twitter limits
-        if len(content) > 280:
-            print(f"📏 Content too long ({len(content)} chars), truncating...")
-            content = content[:277] + "..."
-        
-        # --- UPLOAD MEDIA (using v1.1) ---
-        media_ids = []
-        if image_url:
-            print(f"📤 Uploading media from {image_url}...")
-            
-            # Clean up image URL
-            clean_image_url = image_url.split('?')[0].split('&#')[0]
-            
-            # Use v1.1 API for media upload (this is allowed on Free tier)
-            auth_v1 = tweepy.OAuthHandler(api_key, api_secret)
-            auth_v1.set_access_token(access_token, access_token_secret)
-            api_v1 = tweepy.API(auth_v1)
-            
-            # Download image and upload
-            try:
-                response = requests.get(clean_image_url, timeout=30)
-                response.raise_for_status()
-                
-                # Save temporarily
-                temp_file = "/tmp/tweet_image.jpg"
-                with open(temp_file, "wb") as f:
-                    f.write(response.content)
-                
-                # Check file size
-                file_size = os.path.getsize(temp_file)
-                if file_size > 5 * 1024 * 1024:  # 5MB limit
-                    print(f"⚠️ Image too large ({file_size} bytes), skipping...")
-                else:
-                    media = api_v1.media_upload(filename=temp_file)
-                    media_ids.append(media.media_id_string)
-                    print(f"✅ Media uploaded successfully! ID: {media.media_id_string}")
-                
-                # Clean up
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    
-            except Exception as e:
-                print(f"⚠️ Failed to download/upload image: {e}")
-                # Continue without image
-        
-        # --- CREATE TWEET (using v2) ---
-        client_v2 = tweepy.Client(
-            consumer_key=api_key,
-            consumer_secret=api_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret
-        )
-        
-        # Post the tweet using v2 endpoint
-        if media_ids:
-            response = client_v2.create_tweet(text=content, media_ids=media_ids)
-        else:
-            response = client_v2.create_tweet(text=content)
-        
-        if response and response.data:
-            tweet_id = response.data['id']
-            print(f"🎉 Successfully tweeted! Tweet ID: {tweet_id}")
-            return True
-        else:
-            print("❌ Twitter post failed: No response data")
-            return False
-            
-    except tweepy.TweepyException as e:
-        print(f"❌ Twitter API error: {e}")
-        return False
-    except Exception as e:
-        print(f"💥 Twitter post error: {e}")
-        return False
+def post_to_twitter(content, api_key, api_secret, access_token, access_token_secret, image_url=None, source_url=None):
+    """Queue content in the outbox and post it to Twitter/X with an optional image"""
+    print("🐦 Posting to Twitter/X...")
+    # Clean up image URL
+    if image_url:
+        image_url = image_url.split('?')[0].split('&#')[0]
+    return publisher.post(
+        'post2', content, url=source_url, image_urls=[image_url],
+        credentials=(api_key, api_secret, access_token, access_token_secret)
+    )
 
 # ================================
 # CONTENT GENERATION FUNCTIONS
@@ -330,42 +269,34 @@ def fetch_news_from_feeds(feed_list, category):
     """Generic function to fetch news from RSS feeds"""
     all_articles = []
     
-    for rss_url in feed_list:
+    for rss_url, feed in fetch_feeds(feed_list):
         try:
-            feed = feedparser.parse(rss_url)
-            
             if not feed.entries:
                 continue
             
             for entry in feed.entries[:5]:  # Get more entries to filter from
-                article_date = None
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    article_date = datetime(*entry.published_parsed[:6])
+                article = Article.from_entry(
+                    entry,
+                    source=feed_source(feed, rss_url),
+                    category=category,
+                    image_finder=extract_image_from_entry
+                )
                 
                 # Skip if article is too old
-                if article_date and (datetime.now() - article_date).days > 3:
+                age = article.age()
+                if age is not None and age >= 4 * 86400:
                     continue
                 
-                # Extract image from entry
-                image_url = extract_image_from_entry(entry)
-                
-                article = {
-                    'title': entry.title,
-                    'link': entry.link,
-                    'summary': entry.summary if hasattr(entry, 'summary') else '',
-                    'published': article_date,
-                    'source': feed.feed.title if hasattr(feed.feed, 'title') else rss_url.split('//')[-1].split('/')[0],
-                    'category': category,
-                    'image_url': image_url
-                }
                 all_articles.append(article)
             
-            time.sleep(0.5)
-            
         except Exception as e:
             print(f"⚠️ Error parsing {rss_url}: {e}")
             continue
     
+    # Skip stories we've already posted about
+    posted = history.posted_urls(article.link for article in all_articles)
+    all_articles = [article for article in all_articles if article.link not in posted]
+    
     print(f"✅ Found {len(all_articles)} recent {category} articles")
     return all_articles
 
@@ -451,24 +382,11 @@ def generate_hashtags(topic, content_type):
     Make them feel current and relevant to genuine content.
     """
     
-    try:
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if "candidates" in data and data["candidates"]:
-                hashtags = data["candidates"][0]["content"]["parts"][0]["text"].strip()
-                hashtags = hashtags.replace('```', '').strip()
-                print(f"🏷️ AI-generated hashtags: {hashtags}")
-                return hashtags
-    except Exception as e:
-        print(f"❌ Hashtag generation error: {e}")
+    hashtags = llm.generate(prompt, model=GEMINI_MODEL, timeout=30, cache='hashtags')
+    if hashtags:
+        hashtags = hashtags.replace('```', '').strip()
+        print(f"🏷️ AI-generated hashtags: {hashtags}")
+        return hashtags
     
     # Fallback: Combine AI hashtags with seasonal/day ones
     base_hashtags = "#Tech #GameDev #IndieDev"
@@ -507,11 +425,9 @@ def generate_contextual_cta(post_text, topic):
     """
     
     try:
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
+        response = llm.request(
+            {"contents": [{"parts": [{"text": prompt}]}]},
+            model=GEMINI_MODEL,
             timeout=30
         )
         
@@ -553,11 +469,9 @@ def quality_check_post(post_text, topic, content_type):
     """
     
     try:
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
+        response = llm.request(
+            {"contents": [{"parts": [{"text": prompt}]}]},
+            model=GEMINI_MODEL,
             timeout=30
         )
         
@@ -656,13 +570,14 @@ def get_post_style_prompt(style, topic, content_type):
     
     return base_prompt
 
-def add_conversation_starter(post_text, topic):
+def add_conversation_starter(post_text, topic, cta=None):
     """Add a relevant AI-generated CTA to encourage comments and discussion"""
     # Remove any existing punctuation at the end
     post_text = post_text.rstrip('.,!?')
     
-    # Generate contextual CTA
-    cta = generate_contextual_cta(post_text, topic)
+    # Generate contextual CTA unless one was already produced
+    if not cta:
+        cta = generate_contextual_cta(post_text, topic)
     
     # Ensure we don't exceed character limit
     new_text = f"{post_text} {cta}"
@@ -678,17 +593,17 @@ def add_conversation_starter(post_text, topic):
 def generate_tech_analysis_post(articles):
     """Generate friendly tech analysis post - ONLY QUALITY CONTENT"""
     if not articles:
-        return create_fallback_post('tech'), None
+        return create_fallback_post('tech'), None, None
     
     # RANDOM SELECTION: Pick from filtered quality articles
     selected_articles = random.sample(articles, min(2, len(articles)))
-    main_topic = selected_articles[0]['title']
+    main_topic = selected_articles[0].title
     
     # Try to find an article with an image
     image_url = None
     for article in selected_articles:
-        if article.get('image_url'):
-            image_url = article['image_url']
+        if article.image_url:
+            image_url = article.image_url
             break
     
     # Choose random style for variety
@@ -714,27 +629,25 @@ def generate_tech_analysis_post(articles):
     Return ONLY the post text (without hashtags).
     """
     
-    post_text = generate_ai_content(prompt, selected_articles, 'tech', main_topic)
+    # Generate with conversation starter
+    post_text = generate_ai_content(prompt, selected_articles, 'tech', main_topic, with_cta=True)
     
-    # Add conversation starter
-    post_text = add_conversation_starter(post_text, main_topic)
-    
-    return post_text, image_url
+    return post_text, image_url, selected_articles[0].link
 
 def generate_game_dev_post(articles):
     """Generate friendly game development post - ONLY QUALITY CONTENT"""
     if not articles:
-        return create_fallback_post('game dev'), None
+        return create_fallback_post('game dev'), None, None
     
     # RANDOM SELECTION: Pick from filtered quality articles
     selected_articles = random.sample(articles, min(2, len(articles)))
-    main_topic = selected_articles[0]['title']
+    main_topic = selected_articles[0].title
     
     # Try to find an article with an image
     image_url = None
     for article in selected_articles:
-        if article.get('image_url'):
-            image_url = article['image_url']
+        if article.image_url:
+            image_url = article.image_url
             break
     
     # Choose random style for variety
@@ -766,17 +679,15 @@ def generate_game_dev_post(articles):
     Return ONLY the post text (without hashtags).
     """
     
-    post_text = generate_ai_content(prompt, selected_articles, 'game dev', main_topic)
-    
-    # Add conversation starter
-    post_text = add_conversation_starter(post_text, main_topic)
+    # Generate with conversation starter
+    post_text = generate_ai_content(prompt, selected_articles, 'game dev', main_topic, with_cta=True)
     
-    return post_text, image_url
+    return post_text, image_url, selected_articles[0].link
 
 def generate_trending_topic_post(trends):
     """Generate friendly post about trending topics"""
     if not trends:
-        return create_fallback_post('trending'), None
+        return create_fallback_post('trending'), None, None
     
     # Skip AI-focused trends that create repetitive posts
     filtered_trends = [t for t in trends if not any(ai_word in t.lower() for ai_word in 
@@ -808,12 +719,10 @@ def generate_trending_topic_post(trends):
     Return ONLY the post text (without hashtags).
     """
     
-    post_text = generate_ai_content(prompt, trends, 'trending', main_topic)
+    # Generate with conversation starter
+    post_text = generate_ai_content(prompt, trends, 'trending', main_topic, with_cta=True)
     
-    # Add conversation starter
-    post_text = add_conversation_starter(post_text, main_topic)
-    
-    return post_text, None
+    return post_text, None, None
 
 def generate_trend_based_opinion_poll(trends):
     """Generate opinion poll post based on trending topics - FRIENDLY VERSION"""
@@ -850,61 +759,196 @@ def generate_trend_based_opinion_poll(trends):
     print(f"✅ Friendly opinion poll created ({len(post_text)} chars)")
     return post_text
 
-def generate_ai_content(prompt, content, content_type, main_topic, max_retries=2):
-    """Generate content using AI with quality checks and retries"""
-    for attempt in range(max_retries + 1):
+def generate_combined_content(prompt, content_type, main_topic, count=1):
+    """
+    Generate post text, hashtags, CTA and a self-check in one structured AI
+    call, `count` candidates at once. Returns the parsed candidates, or None
+    when the call failed.
+    """
+    occasion = is_special_occasion()
+    
+    combined_prompt = f"""
+    {prompt}
+    
+    In the same answer, also:
+    1. Write 3-4 relevant, popular hashtags for this {content_type} post about: {main_topic}
+       - Mix popular and niche hashtags
+       - Current season: {get_season()}, today is {datetime.now().strftime('%A')}{f", special occasion: {occasion}" if occasion else ""}
+       - Include seasonal or day-specific hashtags only when relevant (e.g. #ScreenshotSaturday on Saturday)
+    2. Write ONE engaging call-to-action under 40 characters that relates directly to the post,
+       encourages comments and sounds casual and friendly
+    3. Review your own post. Approve it only if it makes logical sense, is factually reasonable,
+       has a friendly conversational tone, has no markdown formatting and is likely to start conversations
+    
+    Respond with ONLY this JSON object:
+    {{"text": "post text without hashtags or CTA", "hashtags": "#First #Second #Third", "cta": "call to action", "self_assessment": {{"approved": true, "reason": "brief reason"}}}}
+    """
+    
+    try:
+        response = llm.request(
+            {
+                "contents": [{"parts": [{"text": combined_prompt}]}],
+                "generationConfig": {"responseMimeType": "application/json", "candidateCount": count}
+            },
+            model=GEMINI_MODEL,
+            api_version="v1beta",
+            timeout=30
+        )
+        
+        if response.status_code != 200:
+            print(f"❌ Combined generation error: {response.text}")
+            return None
+        raw_candidates = llm.texts_of(response.json())
+    except Exception as e:
+        print(f"❌ Combined generation error: {e}")
+        return None
+    
+    results = []
+    for raw in raw_candidates:
         try:
-            print(f"🎭 Generating {content_type} post (attempt {attempt + 1})...")
-            
-            response = requests.post(
-                "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent",
-                params={"key": GEMINI_API_KEY},
-                headers={"Content-Type": "application/json"},
-                json={"contents": [{"parts": [{"text": prompt}]}]},
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "candidates" in data and data["candidates"]:
-                    post_text = data["candidates"][0]["content"]["parts"][0]["text"].strip()
-                    post_text = post_text.replace('```', '').strip()
-                    
-                    # Add AI-generated hashtags for all post types
-                    hashtags = generate_hashtags(main_topic, content_type)
-                    post_text += f" {hashtags}"
-                    
-                    post_text = remove_ai_indicators(post_text)
-                    
-                    # Quality check the post
-                    is_approved, reason = quality_check_post(post_text, main_topic, content_type)
-                    
-                    if is_approved:
-                        # Final length check and truncation if needed
-                        if len(post_text) > 280:
-                            post_text = post_text[:277] + "..."
-                        
-                        print(f"✅ {content_type.title()} post created ({len(post_text)} chars)")
-                        return post_text
-                    else:
-                        print(f"❌ Post rejected: {reason}")
-                        if attempt < max_retries:
-                            print("🔄 Retrying with different approach...")
-                            continue
-                        else:
-                            print("❌ Max retries reached, using fallback")
-                            return create_fallback_post(content_type)
-            else:
-                print(f"❌ AI generation error: {response.text}")
-                
-        except Exception as e:
-            print(f"❌ {content_type} generation error: {e}")
-            if attempt < max_retries:
-                print("🔄 Retrying...")
-                continue
+            result = json.loads(raw.replace('```json', '').replace('```', '').strip())
+        except ValueError:
+            continue
+        
+        text = str(result.get('text') or '').replace('```', '').strip()
+        hashtags = result.get('hashtags') or ''
+        if isinstance(hashtags, list):
+            hashtags = ' '.join(hashtags)
+        cta = str(result.get('cta') or '').replace('"', '').replace("'", "").strip()
+        assessment = result.get('self_assessment') or {}
+        
+        if text and hashtags and cta and isinstance(assessment, dict):
+            print(f"🏷️ AI-generated hashtags: {hashtags}")
+            print(f"💬 AI-generated CTA: {cta}")
+            print(f"🔍 Self-assessment: {assessment}")
+            results.append({
+                'text': text,
+                'hashtags': hashtags.strip(),
+                'cta': cta,
+                # Only an explicit JSON true approves; a missing or odd value rejects
+                'approved': assessment.get('approved') is True,
+                'reason': assessment.get('reason', '')
+            })
+    return results
+
+def check_candidate(post_text, content_type, main_topic, cancelled=None):
+    """
+    Add hashtags to a generated post and quality-check it.
+    Returns the finished post text when approved, otherwise None. Stops
+    early once `cancelled` is set.
+    """
+    post_text = post_text.replace('```', '').strip()
+    
+    # Add AI-generated hashtags for all post types
+    hashtags = generate_hashtags(main_topic, content_type)
+    post_text = remove_ai_indicators(f"{post_text} {hashtags}")
+    
+    if cancelled and cancelled.is_set():
+        return None
+    
+    # Quality check the post
+    is_approved, reason = quality_check_post(post_text, main_topic, content_type)
+    if is_approved:
+        return post_text
+    print(f"❌ Post rejected: {reason}")
+    return None
+
+def generate_first_approved(prompt, content_type, main_topic, count=None):
+    """
+    Generate `count` candidate posts in one request and return the first
+    approved one as (post_text, cta), or None. `cta` is None when it still
+    has to be generated.
+    """
+    count = count or CANDIDATE_COUNT
+    print(f"🎭 Generating {count} {content_type} candidate(s)...")
+    
+    if COMBINED_GENERATION:
+        results = generate_combined_content(prompt, content_type, main_topic, count)
+        if results:
+            # Each candidate carries its own self-check, no further calls needed
+            for result in results:
+                if result['approved']:
+                    return remove_ai_indicators(f"{result['text']} {result['hashtags']}"), result['cta']
+                print(f"❌ Post rejected: {result['reason']}")
+            return None
+        
+        print("⚠️ Combined generation unavailable, falling back to separate calls")
+    
+    try:
+        response = llm.request(
+            {
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": {"candidateCount": count}
+            },
+            model=GEMINI_MODEL,
+            timeout=30
+        )
+        if response.status_code != 200:
+            print(f"❌ AI generation error: {response.text}")
+            return None
+        texts = [text for text in llm.texts_of(response.json()) if text]
+    except Exception as e:
+        print(f"❌ {content_type} generation error: {e}")
+        return None
+    if not texts:
+        return None
+    
+    # Hashtags and quality checks for all candidates run at once; the first
+    # approved one wins
+    cancelled = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(texts))
+    futures = [
+        executor.submit(check_candidate, text, content_type, main_topic, cancelled)
+        for text in texts
+    ]
+    try:
+        for future in as_completed(futures):
+            post_text = future.result()
+            if post_text:
+                return post_text, None
+    finally:
+        # Losing candidates skip their remaining API calls
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return None
+
+def generate_ai_content(prompt, content, content_type, main_topic, max_retries=2, with_cta=False):
+    """
+    Generate content using AI with quality checks and retries.
+    With CANDIDATE_COUNT > 1 one request returns that many candidates,
+    which are checked concurrently and the first approved one wins;
+    otherwise single attempts run one after another.
+    """
+    if CANDIDATE_COUNT > 1:
+        candidate = generate_first_approved(prompt, content_type, main_topic)
+        if candidate:
+            return finish_post(candidate[0], content_type, main_topic, with_cta, candidate[1])
+        print("❌ No candidate approved, using fallback")
+        return create_fallback_post(content_type)
     
+    for attempt in range(max_retries + 1):
+        print(f"🎭 Generating {content_type} post (attempt {attempt + 1})...")
+        candidate = generate_first_approved(prompt, content_type, main_topic, 1)
+        if candidate:
+            return finish_post(candidate[0], content_type, main_topic, with_cta, candidate[1])
+        if attempt < max_retries:
+            print("🔄 Retrying with different approach...")
+    
+    print("❌ Max retries reached, using fallback")
     return create_fallback_post(content_type)
 
+def finish_post(post_text, content_type, main_topic, with_cta=False, cta=None):
+    """Apply the final length check and, if requested, the conversation starter"""
+    if len(post_text) > 280:
+        post_text = post_text[:277] + "..."
+    
+    if with_cta:
+        post_text = add_conversation_starter(post_text, main_topic, cta)
+    
+    print(f"✅ {content_type.title()} post created ({len(post_text)} chars)")
+    return post_text
+
 def remove_ai_indicators(text):
     """Remove any phrases that sound AI-generated"""
     ai_phrases = [
@@ -987,18 +1031,20 @@ def create_opinion_fallback(topic=None):
     
     day_name = datetime.now().strftime("%A").lower()
     
+    # Pick the poll first so only its hashtags are generated
     if day_name == "saturday":
         poll_types = [
-            f"#ScreenshotSaturday poll! What's your weekend focus? 🎮\nA: Visual polish & screenshots\nB: Gameplay mechanics\nC: Level design\nD: Bug fixing\n\nShare your progress below! 👇 {generate_hashtags('ScreenshotSaturday', 'poll')}",
-            f"Saturday game dev question! Working on:\nA: Art & visuals 🖌️\nB: Code & systems 💻\nC: Design & levels 📐\nD: Sound & music 🎵\n\nWhat's your focus today? 💫 {generate_hashtags('GameDev', 'poll')}"
+            ("#ScreenshotSaturday poll! What's your weekend focus? 🎮\nA: Visual polish & screenshots\nB: Gameplay mechanics\nC: Level design\nD: Bug fixing\n\nShare your progress below! 👇", 'ScreenshotSaturday'),
+            ("Saturday game dev question! Working on:\nA: Art & visuals 🖌️\nB: Code & systems 💻\nC: Design & levels 📐\nD: Sound & music 🎵\n\nWhat's your focus today? 💫", 'GameDev')
         ]
     else:
         poll_types = [
-            f"Game dev priority right now? 🎮\nA: Innovation & new ideas\nB: Polish & refinement\nC: Community building\nD: Business sustainability\n\nWhat's your current focus? 👇 {generate_hashtags('GameDev', 'poll')}",
-            f"Tech development approach? 💻\nA: Move fast & break things\nB: Build slow & solid\nC: User-driven iteration\nD: Vision-led creation\n\nYour preferred style? ⬇️ {generate_hashtags('Tech', 'poll')}"
+            ("Game dev priority right now? 🎮\nA: Innovation & new ideas\nB: Polish & refinement\nC: Community building\nD: Business sustainability\n\nWhat's your current focus? 👇", 'GameDev'),
+            ("Tech development approach? 💻\nA: Move fast & break things\nB: Build slow & solid\nC: User-driven iteration\nD: Vision-led creation\n\nYour preferred style? ⬇️", 'Tech')
         ]
     
-    post_text = random.choice(poll_types)
+    poll_text, hashtag_topic = random.choice(poll_types)
+    post_text = f"{poll_text} {generate_hashtags(hashtag_topic, 'poll')}"
     
     # Ensure we don't exceed character limit
     if len(post_text) > 280:
@@ -1058,23 +1104,34 @@ def main():
     print(f"✅ Gemini 2.0 Flash configured")
     print("")
     
+    # Stop before fetching feeds or calling Gemini when the account's
+    # tweet quota is used up
+    if not publisher.can_post():
+        return
+    
+    # A post an earlier run queued but couldn't publish goes out before
+    # anything new is generated
+    if publisher.resume('post2'):
+        return
+    
     # Select post type
     post_type = select_post_type()
     print(f"🎯 Selected post type: {post_type.replace('_', ' ').title()}")
     
     # Gather content based on post type
     image_url = None
+    source_url = None
     if post_type == 'tech':
         articles = fetch_tech_news_from_rss()
-        post_text, image_url = generate_tech_analysis_post(articles)
+        post_text, image_url, source_url = generate_tech_analysis_post(articles)
         
     elif post_type == 'game_dev':
         articles = fetch_game_dev_news_from_rss()
-        post_text, image_url = generate_game_dev_post(articles)
+        post_text, image_url, source_url = generate_game_dev_post(articles)
         
     elif post_type == 'trending':
         trends = get_google_trends_topics()
-        post_text, image_url = generate_trending_topic_post(trends)
+        post_text, image_url, source_url = generate_trending_topic_post(trends)
         
     else:  # opinion_poll
         trends = get_google_trends_topics()
@@ -1093,7 +1150,8 @@ def main():
         TWITTER_API_SECRET, 
         TWITTER_ACCESS_TOKEN, 
         TWITTER_ACCESS_TOKEN_SECRET,
-        image_url
+        image_url,
+        source_url
     )
     
     if success:
@@ -1,12 +1,15 @@
 import os
-import google.generativeai as genai
-import requests
 import random
-import feedparser
-from datetime import datetime
 import re
 import time
-import tweepy
+
+import history
+import images
+import llm
+import publisher
+from articles import Article, feed_source
+from feeds import fetch_feeds
+from keywords import KeywordMatcher
 
 # Configuration
 TWITTER_API_KEY = os.getenv("TWITTER_API_KEY")
@@ -14,10 +17,7 @@ TWITTER_API_SECRET = os.getenv("TWITTER_API_SECRET")
 TWITTER_ACCESS_TOKEN = os.getenv("TWITTER_ACCESS_TOKEN")
 TWITTER_ACCESS_TOKEN_SECRET = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-# Initialize Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.5-flash')
+GEMINI_MODEL = "gemini-2.5-flash"
 
 # Clean RSS feeds - only science/nature/technology (NO POLITICAL CONTENT)
 RSS_FEEDS = [
@@ -34,6 +34,7 @@ POLITICAL_KEYWORDS = [
     'tariff', 'tax', 'war', 'conflict', 'political', 'democrat', 'republican',
     'congress', 'senate', 'white house', 'administration', 'vote', 'campaign'
 ]
+POLITICAL_MATCHER = KeywordMatcher(POLITICAL_KEYWORDS)
 
 # Topic-specific hashtag mapping
 TOPIC_HASHTAGS = {
@@ -53,91 +54,20 @@ TOPIC_HASHTAGS = {
     'robotics': ['#Robotics', '#AI', '#Automation', '#FutureOfWork', '#TechInnovation']
 }
 
-# Cache to avoid duplicate posts
-posted_links = set()
-
 # ================================
 # TWITTER/X API FUNCTIONS
 # ================================
 
-def post_to_twitter(content, api_key, api_secret, access_token, access_token_secret, image_url=None):
-    """Post content to Twitter/X with optional image using the correct API versions"""
-    try:
-        print("🐦 Posting to Twitter/X...")
-        
-        # Ensure content is within Twitter limits
-        if len(content) > 280:
-            print(f"📏 Content too long ({len(content)} chars), truncating...")
-            content = content[:277] + "..."
-        
-        # --- UPLOAD MEDIA (using v1.1) ---
-        media_ids = []
-        if image_url:
-            print(f"📤 Uploading media from {image_url}...")
-            
-            # Clean up image URL
-            clean_image_url = image_url.split('?')[0].split('&#')[0]
-            
-            # Use v1.1 API for media upload (this is allowed on Free tier)
-            auth_v1 = tweepy.OAuthHandler(api_key, api_secret)
-            auth_v1.set_access_token(access_token, access_token_secret)
-            api_v1 = tweepy.API(auth_v1)
-            
-            # Download image and upload
-            try:
-                response = requests.get(clean_image_url, timeout=30)
-                response.raise_for_status()
-                
-                # Save temporarily
-                temp_file = "/tmp/tweet_image.jpg"
-                with open(temp_file, "wb") as f:
-                    f.write(response.content)
-                
-                # Check file size
-                file_size = os.path.getsize(temp_file)
-                if file_size > 5 * 1024 * 1024:  # 5MB limit
-                    print(f"⚠️ Image too large ({file_size} bytes), skipping...")
-                else:
-                    media = api_v1.media_upload(filename=temp_file)
-                    media_ids.append(media.media_id_string)
-                    print(f"✅ Media uploaded successfully! ID: {media.media_id_string}")
-                
-                # Clean up
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    
-            except Exception as e:
-                print(f"⚠️ Failed to download/upload image: {e}")
-                # Continue without image
-        
-        # --- CREATE TWEET (using v2) ---
-        client_v2 = tweepy.Client(
-            consumer_key=api_key,
-            consumer_secret=api_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret
-        )
-        
-        # Post the tweet using v2 endpoint
-        if media_ids:
-            response = client_v2.create_tweet(text=content, media_ids=media_ids)
-        else:
-            response = client_v2.create_tweet(text=content)
-        
-        if response and response.data:
-            tweet_id = response.data['id']
-            print(f"🎉 Successfully tweeted! Tweet ID: {tweet_id}")
-            return True
-        else:
-            print("❌ Twitter post failed: No response data")
-            return False
-            
-    except tweepy.TweepyException as e:
-        print(f"❌ Twitter API error: {e}")
-        return False
-    except Exception as e:
-        print(f"💥 Twitter post error: {e}")
-        return False
+def post_to_twitter(content, api_key, api_secret, access_token, access_token_secret, image_url=None, source_url=None):
+    """Queue content in the outbox and post it to Twitter/X with an optional image"""
+    print("🐦 Posting to Twitter/X...")
+    # Clean up image URL
+    if image_url:
+        image_url = image_url.split('?')[0].split('&#')[0]
+    return publisher.post(
+        'post3', content, url=source_url, image_urls=[image_url],
+        credentials=(api_key, api_secret, access_token, access_token_secret)
+    )
 
 # ================================
 # CONTENT FUNCTIONS (SAME AS THREADS)
@@ -145,100 +75,74 @@ def post_to_twitter(content, api_key, api_secret, access_token, access_token_sec
 
 def contains_political_content(text):
     """Check if text contains political keywords"""
-    if not text:
-        return False
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in POLITICAL_KEYWORDS)
+    return POLITICAL_MATCHER.search(text) is not None
 
 def extract_images_from_rss(entry):
     """Extract all images from RSS entry"""
-    images = []
+    urls = []
     
     # Check multiple possible image sources in RSS
     if hasattr(entry, 'links'):
         for link in entry.links:
             if link.get('type', '').startswith('image/'):
-                images.append(link.href)
+                urls.append(link.href)
     
     # Check media content
     if hasattr(entry, 'media_content'):
         for media in entry.media_content:
             if media.get('type', '').startswith('image/'):
-                images.append(media['url'])
+                urls.append(media['url'])
     
     # Check for enclosures
     if hasattr(entry, 'enclosures'):
         for enclosure in entry.enclosures:
             if enclosure.get('type', '').startswith('image/'):
-                images.append(enclosure.href)
+                urls.append(enclosure.href)
     
     # Parse HTML content for images
     if hasattr(entry, 'content'):
         for content in entry.content:
-            images.extend(re.findall(r'<img[^>]+src="([^">]+)"', content.value))
+            urls.extend(re.findall(r'<img[^>]+src="([^">]+)"', content.value))
     
     if hasattr(entry, 'summary'):
-        images.extend(re.findall(r'<img[^>]+src="([^">]+)"', entry.summary))
-    
-    # Remove duplicates and invalid URLs
-    unique_images = []
-    for img in images:
-        if img and img.startswith(('http://', 'https://')) and img not in unique_images:
-            unique_images.append(img)
+        urls.extend(re.findall(r'<img[^>]+src="([^">]+)"', entry.summary))
     
-    return unique_images
+    # Remove duplicates and invalid URLs, keeping the first-seen order
+    return list(dict.fromkeys(img for img in urls if img and img.startswith(('http://', 'https://'))))
 
 def parse_rss_feeds():
     """Parse all RSS feeds and return non-political entries with images"""
     all_entries = []
     
-    for feed_url in RSS_FEEDS:
+    for feed_url, feed in fetch_feeds(RSS_FEEDS):
         try:
-            feed = feedparser.parse(feed_url)
+            posted = history.posted_urls(entry.get('link') for entry in feed.entries)
             for entry in feed.entries:
-                # Skip if recently posted
-                if entry.link in posted_links:
+                # Skip if already posted
+                if entry.link in posted:
                     continue
                 
+                article = Article.from_entry(entry, source=feed_source(feed, feed_url), image_finder=extract_images_from_rss)
+                
                 # Skip political content
-                if contains_political_content(entry.title) or contains_political_content(entry.get('summary', '')):
+                if contains_political_content(article.title_lower) or contains_political_content(article.summary_lower):
                     continue
                 
                 # Skip old articles (older than 3 days)
-                article_date = None
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    article_date = datetime(*entry.published_parsed[:6])
-                    if article_date and (datetime.now() - article_date).days > 3:
-                        continue
-                
-                # Get images from RSS
-                images = extract_images_from_rss(entry)
+                age = article.age()
+                if age is not None and age >= 4 * 86400:
+                    continue
                 
-                all_entries.append({
-                    'title': entry.title,
-                    'link': entry.link,
-                    'summary': entry.get('summary', ''),
-                    'published': article_date,
-                    'source': feed.feed.title if hasattr(feed.feed, 'title') else feed_url.split('//')[-1].split('/')[0],
-                    'images': images
-                })
+                all_entries.append(article)
                 
         except Exception as e:
             print(f"Error parsing feed {feed_url}: {e}")
     
     return all_entries
 
-def verify_image_url(image_url):
-    """Verify that an image URL is accessible"""
-    try:
-        response = requests.head(image_url, timeout=10)
-        return response.status_code == 200
-    except:
-        return False
-
-def detect_topic(title, summary):
+def detect_topic(article):
     """Detect the main topic of the content for relevant hashtags"""
-    text = (title + ' ' + summary).lower()
+    text = article.title_lower + ' ' + article.summary_lower
     
     topic_weights = {}
     
@@ -348,29 +252,23 @@ def generate_engaging_post():
     entries = parse_rss_feeds()
     
     if not entries:
-        return generate_fallback_post()
+        post_text, image_url = generate_fallback_post()
+        return post_text, image_url, None
     
-    # Prioritize entries with images
-    entries_with_images = [e for e in entries if e.get('images')]
-    if entries_with_images:
-        entry = random.choice(entries_with_images)
-    else:
-        entry = random.choice(entries)
-    
-    posted_links.add(entry['link'])
+    # Prioritize entries with images, only looking for images until one has some
+    random.shuffle(entries)
+    entry = next((e for e in entries if e.images), entries[0])
     
     try:
         # Get a valid image from RSS
         image_url = None
-        if entry.get('images'):
-            for img in entry['images'][:3]:  # Check up to 3 images
-                if verify_image_url(img):
-                    image_url = img
-                    print(f"✅ Using RSS image: {image_url}")
-                    break
+        image = images.first_good_image(entry.images)
+        if image:
+            image_url = image['url']
+            print(f"✅ Using RSS image: {image_url} ({image['width']}x{image['height']})")
         
         # Detect topics for relevant hashtags and CTAs
-        detected_topics = detect_topic(entry['title'], entry.get('summary', ''))
+        detected_topics = detect_topic(entry)
         topic_hashtags = get_topic_hashtags(detected_topics)
         topic_cta = generate_topic_specific_cta(detected_topics, entry)
         
@@ -384,8 +282,8 @@ def generate_engaging_post():
             f"1. Start with an exciting discovery/fact\n"
             f"2. Keep it brief and conversational\n"
             f"3. End with this CTA: '{topic_cta}'\n\n"
-            f"Topic: {entry['title']}\n"
-            f"Details: {entry.get('summary', '')}\n\n"
+            f"Topic: {entry.title}\n"
+            f"Details: {entry.summary}\n\n"
             f"CRITICAL REQUIREMENTS:\n"
             f"- Use a bright, friendly personality 🌟\n"
             f"- Sound like you're talking to friends\n"
@@ -399,8 +297,9 @@ def generate_engaging_post():
             f"'Plants can communicate through fungal networks! 🌱 How cool is that? 🤯 What's the most surprising nature fact you've learned? 👇'\n"
         )
         
-        response = model.generate_content(prompt)
-        text_content = response.text.strip()
+        text_content = llm.generate(prompt, model=GEMINI_MODEL)
+        if not text_content:
+            raise ValueError("Gemini returned no content")
         
         # Clean any remaining formatting
         text_content = re.sub(r'\*\*|\*|__|_|#', '', text_content)
@@ -408,11 +307,12 @@ def generate_engaging_post():
         # Combine with topic-specific hashtags
         final_text = f"{text_content} {topic_hashtags}"
         
-        return final_text, image_url
+        return final_text, image_url, entry.link
         
     except Exception as e:
         print(f"Content generation error: {e}")
-        return generate_fallback_post()
+        post_text, image_url = generate_fallback_post()
+        return post_text, image_url, None
 
 def generate_fallback_post():
     """Fallback content with engaging tone and topic-specific elements - optimized for Twitter"""
@@ -460,8 +360,18 @@ def main():
     print(f"✅ Gemini 2.5 Flash configured")
     print("")
     
+    # Stop before fetching feeds or calling Gemini when the account's
+    # tweet quota is used up
+    if not publisher.can_post():
+        return
+    
+    # A post an earlier run queued but couldn't publish goes out before
+    # anything new is generated
+    if publisher.resume('post3'):
+        return
+    
     # Generate content
-    post_text, image_url = generate_engaging_post()
+    post_text, image_url, source_url = generate_engaging_post()
     
     print(f"📝 Post: {post_text}")
     print(f"📏 Character count: {len(post_text)}")
@@ -475,7 +385,8 @@ def main():
         TWITTER_API_SECRET, 
         TWITTER_ACCESS_TOKEN, 
         TWITTER_ACCESS_TOKEN_SECRET,
-        image_url
+        image_url,
+        source_url
     )
     
     if success:
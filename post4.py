@@ -1,14 +1,13 @@
 import os
-import random
-import feedparser
 import re
-import tweepy
 import time
 
-# =============================
-# GEMINI (NEW SDK)
-# =============================
-from google import genai
+import history
+import llm
+import publisher
+from articles import Article
+from keywords import KeywordMatcher
+from reddit import balance_by_subreddit, fetch_subreddit_feeds
 
 # =============================
 # CONFIGURATION
@@ -20,11 +19,16 @@ TWITTER_ACCESS_TOKEN = os.getenv("TWITTER_ACCESS_TOKEN")
 TWITTER_ACCESS_TOKEN_SECRET = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+POLITICAL_KEYWORDS = [
+    'trump','biden','president','election','government','policy',
+    'tax','war','political','democrat','republican','vote'
+]
+POLITICAL_MATCHER = KeywordMatcher(POLITICAL_KEYWORDS)
+
 # =============================
-# INITIALIZE GEMINI
+# GEMINI
 # =============================
 
-client = genai.Client(api_key=GEMINI_API_KEY)
 MODEL_NAME = "gemini-2.5-flash-lite"
 
 # =============================
@@ -39,40 +43,23 @@ REDDIT_RSS_FEEDS = [
     "https://www.reddit.com/r/technology/.rss"
 ]
 
-posted_links = set()
-
 # =============================
 # TWITTER API
 # =============================
 
-def post_to_twitter(content, api_key, api_secret, access_token, access_token_secret):
-    try:
-        if len(content) > 280:
-            content = content[:277] + "..."
-
-        client_v2 = tweepy.Client(
-            consumer_key=api_key,
-            consumer_secret=api_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret
-        )
-
-        response = client_v2.create_tweet(text=content)
-        return bool(response and response.data)
-    except Exception as e:
-        print(f"Twitter post error: {e}")
-        return False
+def post_to_twitter(content, api_key, api_secret, access_token, access_token_secret, source_url=None):
+    # Quote card attached at publish time (media upload is v1.1 only)
+    return publisher.post(
+        'post4', content, url=source_url, card_theme='post4',
+        credentials=(api_key, api_secret, access_token, access_token_secret)
+    )
 
 # =============================
 # HELPERS
 # =============================
 
 def contains_political_content(text):
-    POLITICAL_KEYWORDS = [
-        'trump','biden','president','election','government','policy',
-        'tax','war','political','democrat','republican','vote'
-    ]
-    return any(k in text.lower() for k in POLITICAL_KEYWORDS) if text else False
+    return POLITICAL_MATCHER.search(text) is not None
 
 # =============================
 # PARSE REDDIT RSS
@@ -81,20 +68,18 @@ def contains_political_content(text):
 def parse_reddit_rss():
     entries = []
 
-    for url in REDDIT_RSS_FEEDS:
+    # All subreddits come from one combined listing
+    for url, feed in fetch_subreddit_feeds(REDDIT_RSS_FEEDS, per_subreddit=20):
         try:
-            feed = feedparser.parse(url)
+            posted = history.posted_urls(entry.get('link') for entry in feed.entries)
             for entry in feed.entries:
-                if entry.link in posted_links:
+                if entry.link in posted:
                     continue
-                if contains_political_content(entry.title) or contains_political_content(entry.get('summary', '')):
+                article = Article.from_entry(entry)
+                if contains_political_content(article.title_lower) or contains_political_content(article.summary_lower):
                     continue
 
-                entries.append({
-                    'title': entry.title,
-                    'link': entry.link,
-                    'summary': entry.get('summary', '')
-                })
+                entries.append(article)
         except Exception as e:
             print(f"RSS error {url}: {e}")
 
@@ -123,17 +108,18 @@ def generate_engaging_post(max_retries=3):
         print("❌ No valid RSS entries found after all retries.")
         return None, None
     
+    # Give every subreddit the same chance, not just the busiest ones in the
+    # combined listing
+    entries = balance_by_subreddit(entries, shuffle=True)
+
     # Try different entries if generation fails
     for attempt in range(min(3, len(entries))):  # Try up to 3 different entries
-        entry = random.choice(entries)
-        entries.remove(entry)  # Remove from list to avoid trying same entry again
-        
-        posted_links.add(entry['link'])
+        entry = entries[attempt]
 
         prompt = (
             f"Create ONE standalone, easy-to-read tweet about this online discussion:\n\n"
-            f"Title: {entry['title']}\n"
-            f"Summary: {entry['summary']}\n\n"
+            f"Title: {entry.title}\n"
+            f"Summary: {entry.summary}\n\n"
             f"Requirements:\n"
             f"- Funny or insightful observation about modern life, work, relationships, or internet culture\n"
             f"- MUST be written in third-person or neutral tone\n"
@@ -151,19 +137,8 @@ def generate_engaging_post(max_retries=3):
         )
 
         try:
-            print(f"Attempting to generate tweet from: {entry['title'][:50]}...")
-            response = client.models.generate_content(
-                model=MODEL_NAME,
-                contents=prompt
-            )
-
-            text = ""
-            if response and response.candidates:
-                for part in response.candidates[0].content.parts:
-                    if hasattr(part, "text") and part.text:
-                        text += part.text
-
-            text = text.strip()
+            print(f"Attempting to generate tweet from: {entry.title[:50]}...")
+            text = llm.generate(prompt, model=MODEL_NAME)
             if not text:
                 print(f"✗ Gemini returned empty content for this entry, trying another...")
                 if attempt < min(2, len(entries)):  # If not last attempt
@@ -185,7 +160,7 @@ def generate_engaging_post(max_retries=3):
                 final_tweet = final_tweet[:277] + "..."
 
             print(f"✓ Successfully generated tweet from entry {attempt + 1}")
-            return final_tweet, None
+            return final_tweet, entry.link
 
         except Exception as e:
             print(f"✗ AI generation failed for this entry: {e}")
@@ -218,8 +193,18 @@ def main():
         print("❌ Missing GEMINI_API_KEY")
         return
 
+    # Stop before fetching feeds or calling Gemini when the account's
+    # tweet quota is used up
+    if not publisher.can_post():
+        return
+
+    # A post an earlier run queued but couldn't publish goes out before
+    # anything new is generated
+    if publisher.resume('post4'):
+        return
+
     print("Starting content generation process...")
-    post_text, _ = generate_engaging_post()
+    post_text, source_url = generate_engaging_post()
     
     if not post_text:
         print("❌ Failed to generate a tweet after all retries. Skipping post.")
@@ -243,10 +228,14 @@ def main():
         TWITTER_API_KEY,
         TWITTER_API_SECRET,
         TWITTER_ACCESS_TOKEN,
-        TWITTER_ACCESS_TOKEN_SECRET
+        TWITTER_ACCESS_TOKEN_SECRET,
+        source_url
     )
 
-    print("✅ Posted!" if success else "❌ Failed to post.")
+    if success:
+        print("✅ Posted!")
+    else:
+        print("❌ Failed to post.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
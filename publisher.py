@@ -0,0 +1,447 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from urllib.parse import unquote, urlparse
+
+import requests
+import tweepy
+from requests.adapters import HTTPAdapter
+
+import cards
+import history
+import images
+import storage
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Twitter's tweet length limit
+MAX_TWEET_CHARS = 280
+
+# Tweets a run tries before leaving the post for the next run
+MAX_ATTEMPTS = 4
+
+# Longest a run sleeps for a rate limit to reset; longer waits are left to
+# the next scheduled run
+MAX_WAIT = int(os.environ.get('OUTBOX_MAX_WAIT', '120'))
+
+# First retry delay after a server error or network failure, doubled on
+# every further attempt
+BACKOFF_SECONDS = 5
+
+# Queued posts are topical; older ones are dropped rather than published late
+OUTBOX_MAX_AGE = 12 * 3600
+
+# Finished posts are kept this long so a repeated enqueue is recognised
+OUTBOX_KEEP_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    bot TEXT NOT NULL,
+    url TEXT,
+    text TEXT NOT NULL,
+    image_urls TEXT NOT NULL,
+    card_theme TEXT,
+    media_ids TEXT,
+    status TEXT NOT NULL,
+    tweet_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_bot_status ON outbox (bot, status);
+"""
+
+# Tweets one account may post per rolling day and month; the free tier
+# allows 17 and 500. 0 turns a local cap off and leaves only the headers.
+DAILY_TWEET_LIMIT = int(os.environ.get('TWITTER_DAILY_LIMIT', '17'))
+MONTHLY_TWEET_LIMIT = int(os.environ.get('TWITTER_MONTHLY_LIMIT', '500'))
+
+QUOTA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    account TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS writes_account_at ON writes (account, at);
+CREATE TABLE IF NOT EXISTS rate_limits (
+    account TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    quota INTEGER,
+    remaining INTEGER,
+    reset REAL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (account, scope)
+);
+"""
+
+TWITTER_HOSTS = {'api.twitter.com', 'upload.twitter.com', 'api.x.com', 'upload.x.com'}
+
+# Rate-limit header families Twitter sends, by the scope they count against
+LIMIT_HEADERS = {
+    'x-rate-limit': 'endpoint',
+    'x-user-limit-24hour': 'user 24h',
+    'x-app-limit-24hour': 'app 24h',
+}
+
+# Recorded scopes that limit posting a tweet; exhausted media-upload or
+# read windows don't stop a text-only tweet
+TWEET_SCOPES = ('POST /2/tweets', 'user 24h', 'app 24h')
+
+OAUTH_PARAM_RE = re.compile(r'(oauth_consumer_key|oauth_token)="([^"]*)"')
+
+# ================================
+# TWITTER CLIENT POOL
+# ================================
+# Every bot used to build a new tweepy.Client, OAuthHandler and API (each
+# with its own requests.Session) for every post. Clients are now created
+# once per credential set and share one keep-alive session, so the media
+# upload and the tweet that follows it reuse warm connections.
+
+_session = None
+_clients = {}
+_lock = threading.Lock()
+
+def env_credentials():
+    """(api_key, api_secret, access_token, access_token_secret) from the environment"""
+    return (
+        os.environ.get('TWITTER_API_KEY'),
+        os.environ.get('TWITTER_API_SECRET'),
+        os.environ.get('TWITTER_ACCESS_TOKEN'),
+        os.environ.get('TWITTER_ACCESS_TOKEN_SECRET'),
+    )
+
+def _get_session():
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        session.mount('https://', adapter)
+        session.hooks['response'].append(_record_response)
+        _session = session
+    return _session
+
+def _clients_for(credentials):
+    with _lock:
+        pair = _clients.get(credentials)
+        if pair is None:
+            api_key, api_secret, access_token, access_token_secret = credentials
+            api = tweepy.API(tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_token_secret))
+            client = tweepy.Client(
+                consumer_key=api_key,
+                consumer_secret=api_secret,
+                access_token=access_token,
+                access_token_secret=access_token_secret
+            )
+            # tweepy keeps no auth on the session itself, so it can be shared
+            api.session = client.session = _get_session()
+            pair = _clients[credentials] = (api, client)
+    return pair
+
+def api_v1(api_key=None, api_secret=None, access_token=None, access_token_secret=None):
+    """Shared v1.1 API (media uploads) for a credential set, defaulting to the environment's"""
+    credentials = (api_key, api_secret, access_token, access_token_secret)
+    return _clients_for(credentials if any(credentials) else env_credentials())[0]
+
+def client_v2(api_key=None, api_secret=None, access_token=None, access_token_secret=None):
+    """Shared v2 Client (tweets) for a credential set, defaulting to the environment's"""
+    credentials = (api_key, api_secret, access_token, access_token_secret)
+    return _clients_for(credentials if any(credentials) else env_credentials())[1]
+
+# ================================
+# WRITE QUOTA LEDGER
+# ================================
+# Free-tier accounts can only post a handful of tweets a day, and all eight
+# bots may share one account. Every Twitter write and the rate-limit
+# headers on every Twitter response are recorded, keyed by a hash of the
+# credentials, so a run can tell before fetching feeds or calling Gemini
+# that its tweet would only get a 429.
+
+def _quota_db():
+    return storage.connect('quota.sqlite', QUOTA_SCHEMA)
+
+def _account_ids(consumer_key, token):
+    """(account id, app id) for a credential set; the keys themselves are never stored"""
+    def digest(*parts):
+        return hashlib.sha256('\0'.join(p or '' for p in parts).encode('utf-8')).hexdigest()[:16]
+    return digest(consumer_key, token), 'app:' + digest(consumer_key)
+
+def _record_response(response, *args, **kwargs):
+    """Session hook: remember writes and rate-limit headers of Twitter responses"""
+    try:
+        request = response.request
+        url = urlparse(request.url)
+        if url.hostname not in TWITTER_HOSTS:
+            return
+        oauth = dict(OAUTH_PARAM_RE.findall(request.headers.get('Authorization', '')))
+        if not oauth:
+            return
+        account, app = _account_ids(unquote(oauth.get('oauth_consumer_key', '')), unquote(oauth.get('oauth_token', '')))
+        endpoint = f"{request.method} {url.path}"
+        now = time.time()
+
+        db = _quota_db()
+        with db:
+            if request.method == 'POST' and 200 <= response.status_code < 300:
+                db.execute("INSERT INTO writes (account, endpoint, at) VALUES (?, ?, ?)", (account, endpoint, now))
+            for prefix, scope in LIMIT_HEADERS.items():
+                remaining = response.headers.get(f"{prefix}-remaining", '')
+                if not remaining.isdigit():
+                    continue
+                quota = response.headers.get(f"{prefix}-limit", '')
+                reset = response.headers.get(f"{prefix}-reset", '')
+                db.execute(
+                    "INSERT OR REPLACE INTO rate_limits (account, scope, quota, remaining, reset, seen_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (app if scope == 'app 24h' else account, endpoint if scope == 'endpoint' else scope,
+                     int(quota) if quota.isdigit() else None, int(remaining),
+                     float(reset) if reset.isdigit() else None, now)
+                )
+            db.execute("DELETE FROM writes WHERE at < ?", (now - 31 * 86400,))
+    except Exception as e:
+        # The ledger must never break a post
+        print(f"⚠️ Could not record Twitter quota: {e}")
+
+def can_post(credentials=None):
+    """
+    Whether the account can tweet right now according to the ledger: no
+    recorded tweet limit is used up and the local daily and monthly caps aren't
+    reached. Prints the reason and when it clears when it can't.
+    """
+    api_key, _, access_token, _ = credentials or env_credentials()
+    account, app = _account_ids(api_key, access_token)
+    now = time.time()
+    db = _quota_db()
+
+    row = db.execute(
+        f"SELECT scope, reset FROM rate_limits WHERE account IN (?, ?) "
+        f"AND scope IN ({', '.join('?' * len(TWEET_SCOPES))}) AND remaining <= 0 AND reset > ? "
+        "ORDER BY reset DESC LIMIT 1",
+        (account, app, *TWEET_SCOPES, now)
+    ).fetchone()
+    if row:
+        print(f"⛔ Twitter {row[0]} limit used up, resets in {(row[1] - now) / 60:.0f} min. Not generating a post.")
+        return False
+
+    for limit, days, label in ((DAILY_TWEET_LIMIT, 1, 'daily'), (MONTHLY_TWEET_LIMIT, 30, 'monthly')):
+        if not limit:
+            continue
+        since = now - days * 86400
+        recent = [at for (at,) in db.execute(
+            "SELECT at FROM writes WHERE account = ? AND endpoint = 'POST /2/tweets' AND at > ? ORDER BY at",
+            (account, since)
+        )]
+        if len(recent) >= limit:
+            # A slot frees up when the oldest tweet over the cap leaves the window
+            frees_at = recent[len(recent) - limit] + days * 86400
+            print(f"⛔ {len(recent)} tweets in the last {days} day(s) reach the {label} cap of {limit}, "
+                  f"next slot in {(frees_at - now) / 3600:.1f}h. Not generating a post.")
+            return False
+    return True
+
+# ================================
+# OUTBOX
+# ================================
+# A generated post is written to the outbox before Twitter is contacted and
+# only marked posted once create_tweet returns. A post that hit a rate limit
+# or a server error stays queued, and the bot's next run publishes it
+# instead of fetching feeds and calling Gemini again.
+#
+# Each post is keyed by a hash of its bot and text, so queueing the same
+# post twice is a no-op. A run that died after create_tweet but before
+# recording it retries the post and Twitter's duplicate-content refusal
+# marks it posted rather than publishing it twice.
+
+def _db():
+    return storage.connect('outbox.sqlite', SCHEMA)
+
+def idempotency_key(bot, text):
+    """Stable key of a bot's post"""
+    return hashlib.sha256(f"{bot}\0{text}".encode('utf-8')).hexdigest()[:32]
+
+def _load(key):
+    cursor = _db().execute("SELECT * FROM outbox WHERE key = ?", (key,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    entry = dict(zip((c[0] for c in cursor.description), row))
+    entry['image_urls'] = json.loads(entry['image_urls'])
+    entry['media_ids'] = json.loads(entry['media_ids']) if entry['media_ids'] is not None else None
+    return entry
+
+def _update(key, **fields):
+    if 'media_ids' in fields:
+        fields['media_ids'] = json.dumps(fields['media_ids'])
+    fields['updated_at'] = time.time()
+    db = _db()
+    with db:
+        db.execute(
+            f"UPDATE outbox SET {', '.join(f'{name} = ?' for name in fields)} WHERE key = ?",
+            (*fields.values(), key)
+        )
+
+def enqueue(bot, text, url=None, image_urls=(), card_theme=None):
+    """
+    Queue a post, trimmed to Twitter's limit, and return its idempotency key.
+    `image_urls` are uploaded with the tweet; `card_theme` attaches a quote
+    card instead.
+    """
+    if len(text) > MAX_TWEET_CHARS:
+        print(f"📏 Content too long ({len(text)} chars), truncating...")
+        text = text[:MAX_TWEET_CHARS - 3] + "..."
+    key = idempotency_key(bot, text)
+    now = time.time()
+    db = _db()
+    with db:
+        db.execute(
+            "INSERT INTO outbox (key, bot, url, text, image_urls, card_theme, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?) "
+            # A post that expired or failed before is queued afresh
+            "ON CONFLICT (key) DO UPDATE SET status = 'pending', attempts = 0, media_ids = NULL, "
+            "next_attempt_at = 0, error = NULL, created_at = excluded.created_at, updated_at = excluded.updated_at "
+            "WHERE status IN ('expired', 'failed')",
+            (key, bot, url, text, json.dumps([u for u in image_urls if u]), card_theme, now, now)
+        )
+        db.execute(
+            "DELETE FROM outbox WHERE status NOT IN ('pending', 'sending') AND updated_at < ?",
+            (now - OUTBOX_KEEP_DAYS * 86400,)
+        )
+    return key
+
+def pending(bot):
+    """Oldest unpublished post of a bot, or None; stale posts are expired on the way"""
+    db = _db()
+    with db:
+        db.execute(
+            "UPDATE outbox SET status = 'expired', updated_at = ? "
+            "WHERE bot = ? AND status IN ('pending', 'sending') AND created_at < ?",
+            (time.time(), bot, time.time() - OUTBOX_MAX_AGE)
+        )
+    row = db.execute(
+        "SELECT key FROM outbox WHERE bot = ? AND status IN ('pending', 'sending') ORDER BY created_at LIMIT 1",
+        (bot,)
+    ).fetchone()
+    return _load(row[0]) if row else None
+
+def _retry_delay(error, attempt):
+    """Seconds until a failed tweet is worth retrying"""
+    response = getattr(error, 'response', None)
+    headers = response.headers if response is not None else {}
+    reset = headers.get('x-rate-limit-reset', '')
+    if reset.isdigit():
+        return max(int(reset) - time.time(), 0) + 1
+    retry_after = headers.get('retry-after', '')
+    if retry_after.isdigit():
+        return int(retry_after)
+    return BACKOFF_SECONDS * 2 ** attempt + random.uniform(0, 1)
+
+def _upload_media(entry, api):
+    """Upload the post's images or quote card; failures leave the tweet text-only"""
+    if entry['card_theme']:
+        return cards.upload_for(api, entry['text'], entry['card_theme'])
+    media_ids = []
+    for url in entry['image_urls']:
+        print(f"📤 Uploading media from {url}...")
+        try:
+            media_ids.append(images.upload(api, url))
+            print(f"✅ Media uploaded successfully! ID: {media_ids[-1]}")
+        except Exception as e:
+            print(f"⚠️ Failed to download/upload image: {e}")
+    return media_ids
+
+def publish(key, credentials=None):
+    """
+    Publish a queued post, waiting out short rate limits and retrying server
+    errors with backoff. Returns True once this call puts the post on Twitter,
+    False when it was already posted, failed for good or is left queued for a
+    later run.
+    """
+    entry = _load(key)
+    if entry is None:
+        return False
+    if entry['status'] == 'posted':
+        print(f"⏭️ Already posted as {entry['tweet_id']}, skipping")
+        return False
+    if entry['status'] not in ('pending', 'sending'):
+        return False
+
+    api, client = _clients_for(credentials or env_credentials())
+    for attempt in range(MAX_ATTEMPTS):
+        wait = entry['next_attempt_at'] - time.time()
+        if wait > MAX_WAIT:
+            print(f"⏳ Rate limited for another {wait:.0f}s, leaving the post queued for the next run")
+            return False
+        if wait > 0:
+            print(f"⏳ Waiting {wait:.0f}s before retrying...")
+            time.sleep(wait)
+
+        entry['attempts'] += 1
+        _update(key, status='sending', attempts=entry['attempts'])
+        try:
+            # Media ids stay valid for a day, so a retry reuses the uploads
+            if entry['media_ids'] is None:
+                entry['media_ids'] = _upload_media(entry, api)
+                _update(key, media_ids=entry['media_ids'])
+            response = client.create_tweet(text=entry['text'], media_ids=entry['media_ids'] or None)
+            tweet_id = response.data['id']
+        except (tweepy.TooManyRequests, tweepy.TwitterServerError, requests.RequestException) as e:
+            delay = _retry_delay(e, attempt)
+            print(f"⚠️ Twitter post failed ({e}), retrying in {delay:.0f}s")
+            entry['next_attempt_at'] = time.time() + delay
+            _update(key, status='pending', next_attempt_at=entry['next_attempt_at'], error=str(e)[:500])
+            continue
+        except tweepy.Forbidden as e:
+            # Only a retry can have been sent before; on a first attempt the
+            # refusal means an identical tweet already exists, not this one
+            if 'duplicate' not in str(e).lower() or entry['attempts'] <= 1:
+                print(f"❌ Twitter API error: {e}")
+                _update(key, status='failed', error=str(e)[:500])
+                return False
+            # An earlier attempt got through before its run could record it
+            print("✅ Twitter already has this post, marking it published")
+            tweet_id = None
+        except Exception as e:
+            print(f"❌ Twitter post error: {e}")
+            _update(key, status='failed', error=str(e)[:500])
+            return False
+
+        _update(key, status='posted', tweet_id=tweet_id, error=None)
+        history.record_post(entry['bot'], entry['url'], tweet_id, entry['text'])
+        if tweet_id:
+            print(f"🎉 Successfully tweeted! Tweet ID: {tweet_id}")
+        return True
+
+    print(f"⚠️ Gave up after {MAX_ATTEMPTS} attempts, leaving the post queued for the next run")
+    return False
+
+def post(bot, text, url=None, image_urls=(), card_theme=None, credentials=None):
+    """
+    Queue a post and publish it straight away; returns True only when this call
+    puts it on Twitter.
+    Posts that reword an earlier tweet from any bot are dropped unqueued.
+    """
+    duplicate = history.find_similar(text)
+    if duplicate:
+        print(f"🚫 {duplicate['similarity']:.0%} similar to an earlier {duplicate['bot']} tweet, not posting: {duplicate['text']}")
+        return False
+    return publish(enqueue(bot, text, url, image_urls, card_theme), credentials)
+
+def resume(bot, credentials=None):
+    """
+    Publish a post an earlier run of `bot` queued but couldn't get out.
+    Returns True when the outbox held one, whether or not it went out now,
+    so the run can stop instead of generating another post.
+    """
+    entry = pending(bot)
+    if entry is None:
+        return False
+    print(f"📬 Resuming a queued post from an earlier run: {entry['text'][:80]}...")
+    publish(entry['key'], credentials)
+    return True
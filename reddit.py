@@ -0,0 +1,106 @@
+import itertools
+import random
+import re
+from urllib.parse import urlparse
+
+import feedparser
+
+from feeds import FEED_TIMEOUT, fetch_feeds
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Reddit caps a listing at 100 items
+MAX_LIMIT = 100
+
+SUBREDDIT_RE = re.compile(r'/r/([A-Za-z0-9_]+)', re.IGNORECASE)
+
+# ================================
+# MULTIREDDIT FEEDS
+# ================================
+# Reddit serves several subreddits as one listing (/r/a+b+c/.rss), so a bot
+# that follows ten subreddits needs one or two requests instead of ten.
+# Entries are split back out by subreddit so callers still see one feed
+# per configured URL. The combined listing is ranked across all of its
+# subreddits, so busy ones can take more of the limit than quiet ones;
+# balance_by_subreddit gives every subreddit its turn again.
+
+def subreddit_of(url):
+    """Subreddit name in a reddit URL, or None"""
+    match = SUBREDDIT_RE.search(urlparse(url).path)
+    return match.group(1) if match else None
+
+def multireddit_urls(subreddits, per_subreddit=25):
+    """
+    Combined listing URLs covering the subreddits, as few as the listing
+    limit allows while still asking for `per_subreddit` items each.
+    Subreddits are sorted so the same set always gives the same URLs, which
+    the feed cache and feed health records are keyed by.
+    """
+    subreddits = sorted(set(subreddits), key=str.lower)
+    per_subreddit = max(1, min(per_subreddit, MAX_LIMIT))
+    group_size = max(1, MAX_LIMIT // per_subreddit)
+    urls = []
+    for i in range(0, len(subreddits), group_size):
+        group = subreddits[i:i + group_size]
+        limit = min(MAX_LIMIT, per_subreddit * len(group))
+        urls.append(f"https://www.reddit.com/r/{'+'.join(group)}/.rss?limit={limit}")
+    return urls
+
+def _entry_subreddit(entry):
+    """Subreddit an entry of a combined listing came from"""
+    for tag in entry.get('tags') or []:
+        if tag.get('term'):
+            return tag['term']
+    return subreddit_of(entry.get('link', ''))
+
+def fetch_subreddit_feeds(feed_urls, per_subreddit=25, timeout=FEED_TIMEOUT):
+    """
+    Fetch subreddit RSS feeds through combined listings.
+    Yields (feed_url, feed) for each configured feed URL that got entries,
+    with `feed.entries` holding only that subreddit's items and each entry
+    tagged with its `subreddit`. URLs that aren't subreddit feeds are
+    fetched on their own.
+    """
+    by_name = {}
+    others = []
+    for url in feed_urls:
+        name = subreddit_of(url) if 'reddit.com' in urlparse(url).netloc else None
+        if name:
+            by_name[name.lower()] = url
+        else:
+            others.append(url)
+
+    names = [subreddit_of(url) for url in by_name.values()]
+    combined = multireddit_urls(names, per_subreddit) + others
+
+    for url, feed in fetch_feeds(combined, timeout=timeout):
+        if url in others:
+            yield url, feed
+            continue
+
+        grouped = {}
+        for entry in feed.entries:
+            name = (_entry_subreddit(entry) or '').lower()
+            if name in by_name:
+                entry['subreddit'] = subreddit_of(by_name[name])
+                grouped.setdefault(name, []).append(entry)
+
+        for name, entries in grouped.items():
+            yield by_name[name], feedparser.FeedParserDict(feed=feed.feed, entries=entries[:per_subreddit])
+
+def balance_by_subreddit(entries, limit=None, shuffle=False):
+    """
+    Interleave entries by their `subreddit` so every subreddit gets one
+    entry in before any gets a second, keeping each subreddit's own order.
+    `shuffle` puts the subreddits in random order; `limit` caps the result.
+    """
+    groups = {}
+    for entry in entries:
+        groups.setdefault(getattr(entry, 'subreddit', None), []).append(entry)
+    groups = list(groups.values())
+    if shuffle:
+        random.shuffle(groups)
+    balanced = [entry for turn in itertools.zip_longest(*groups) for entry in turn if entry is not None]
+    return balanced[:limit] if limit else balanced
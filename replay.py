@@ -0,0 +1,240 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# ================================
+# HTTP RECORD / REPLAY
+# ================================
+# Every HTTP request the bots make (feeds, Gemini, images, trends, tweepy)
+# goes through requests' HTTPAdapter.send, so patching that one method is
+# enough to capture or serve the whole run. Twitter is never contacted in
+# either mode: its endpoints get synthetic replies so recording a fixture
+# cannot post a real tweet.
+
+# Query parameters that carry secrets and are left out of fixtures
+SECRET_PARAMS = {'key', 'api_key', 'access_token'}
+
+# Response headers worth keeping in a fixture
+KEPT_HEADERS = {
+    'content-type', 'etag', 'last-modified', 'retry-after', 'location',
+    'x-rate-limit-limit', 'x-rate-limit-remaining', 'x-rate-limit-reset',
+}
+
+TWITTER_HOSTS = {'api.twitter.com', 'upload.twitter.com', 'api.x.com', 'upload.x.com'}
+GEMINI_HOSTS = {'generativelanguage.googleapis.com'}
+
+_original_send = HTTPAdapter.send
+# Held separately so a benchmark timing time.sleep doesn't count injected latency
+_sleep = time.sleep
+_active = None
+_lock = threading.Lock()
+
+# ================================
+# HELPERS
+# ================================
+
+def _clean_url(url):
+    """URL with secret query parameters removed, used as the fixture key"""
+    parts = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS]
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+def _body_hash(request):
+    """
+    Hash of a POST body, so replies are matched to their request rather than
+    to their place in the queue (every Gemini call shares one URL)
+    """
+    if request.method != 'POST' or not request.body:
+        return None
+    body = request.body if isinstance(request.body, bytes) else str(request.body).encode('utf-8')
+    return hashlib.sha256(body).hexdigest()[:16]
+
+def _host(url):
+    return (urlparse(url).hostname or '').lower()
+
+def classify(url, content_type=''):
+    """Stage a request belongs to, for the benchmark breakdown"""
+    host = _host(url)
+    content_type = (content_type or '').lower()
+    if host in GEMINI_HOSTS:
+        return 'gemini'
+    if host in TWITTER_HOSTS:
+        return 'twitter'
+    if 'trends.google' in host:
+        return 'trends'
+    if content_type.startswith('image/'):
+        return 'media'
+    if any(kind in content_type for kind in ('xml', 'rss', 'atom')):
+        return 'feeds'
+    return 'other'
+
+def _build_response(request, status, headers, body):
+    """requests.Response served without touching the network"""
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response._content_consumed = True
+    response.raw = None
+    response.url = request.url
+    response.request = request
+    response.reason = requests.status_codes._codes.get(status, ('',))[0].upper().replace('_', ' ')
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+def _twitter_reply(request):
+    """Synthetic Twitter reply for the endpoints the bots use"""
+    path = urlparse(request.url).path
+    tweet_id = str(int(time.time() * 1000))
+    user = {'id': 1, 'id_str': '1', 'screen_name': 'replay', 'name': 'Replay'}
+
+    if path.endswith('/2/tweets'):
+        body = {'data': {'id': tweet_id, 'text': '', 'edit_history_tweet_ids': [tweet_id]}}
+    elif 'media/upload' in path:
+        body = {'media_id': int(tweet_id), 'media_id_string': tweet_id, 'size': 0}
+    elif 'verify_credentials' in path:
+        body = user
+    elif 'statuses/update' in path:
+        body = {'id': int(tweet_id), 'id_str': tweet_id, 'text': '', 'user': user}
+    else:
+        body = {}
+    return 200, {'content-type': 'application/json'}, json.dumps(body).encode('utf-8')
+
+# ================================
+# SESSIONS
+# ================================
+
+class Session:
+    """
+    One recording or replay session. Call stats are kept per stage:
+    request count, summed request seconds and bytes received.
+    """
+
+    def __init__(self, path, mode, latency='recorded', host_latency=None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown replay mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        # 'recorded' replays each call's original duration, a number is a fixed
+        # delay in seconds; host_latency overrides it per hostname
+        self.latency = latency
+        self.host_latency = dict(host_latency or {})
+        self.entries = defaultdict(list)
+        self.cursors = defaultdict(int)
+        self.misses = []
+        self.stats = defaultdict(lambda: {'calls': 0, 'seconds': 0.0, 'bytes': 0})
+
+        if mode == 'replay':
+            with open(path, 'r', encoding='utf-8') as f:
+                for entry in json.load(f)['entries']:
+                    self.entries[(entry['method'], entry['url'], entry.get('body_hash'))].append(entry)
+
+    def _record_stat(self, stage, seconds, size):
+        with _lock:
+            stat = self.stats[stage]
+            stat['calls'] += 1
+            stat['seconds'] += seconds
+            stat['bytes'] += size
+
+    def _delay(self, url, recorded):
+        host = _host(url)
+        if host in self.host_latency:
+            return self.host_latency[host]
+        if self.latency == 'recorded':
+            return recorded
+        return float(self.latency)
+
+    def send(self, adapter, request, **kwargs):
+        started = time.monotonic()
+        url = _clean_url(request.url)
+
+        if _host(url) in TWITTER_HOSTS:
+            status, headers, body = _twitter_reply(request)
+            _sleep(self._delay(url, 0.0))
+            response = _build_response(request, status, headers, body)
+        elif self.mode == 'record':
+            response = _original_send(adapter, request, **kwargs)
+            body = response.content
+            entry = {
+                'method': request.method,
+                'url': url,
+                'body_hash': _body_hash(request),
+                'status': response.status_code,
+                'headers': {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS},
+                'body': base64.b64encode(body).decode('ascii'),
+                'elapsed': round(time.monotonic() - started, 4),
+            }
+            with _lock:
+                self.entries[(request.method, url, entry['body_hash'])].append(entry)
+        else:
+            key = (request.method, url, _body_hash(request))
+            with _lock:
+                recorded = self.entries.get(key)
+                if not recorded and key[2] and (request.method, url, None) in self.entries:
+                    # Fixtures recorded before bodies were hashed
+                    key = (request.method, url, None)
+                    recorded = self.entries[key]
+                if not recorded:
+                    self.misses.append(f"{request.method} {url}")
+                    entry = None
+                else:
+                    # Repeated calls walk through the recorded replies, then repeat the last one
+                    entry = recorded[min(self.cursors[key], len(recorded) - 1)]
+                    self.cursors[key] += 1
+            if entry is None:
+                raise requests.exceptions.ConnectionError(f"No recorded response for {request.method} {url}")
+            _sleep(self._delay(url, entry['elapsed']))
+            response = _build_response(request, entry['status'], entry['headers'], base64.b64decode(entry['body']))
+
+        self._record_stat(
+            classify(url, response.headers.get('content-type')),
+            time.monotonic() - started,
+            len(response.content or b'')
+        )
+        return response
+
+    def save(self):
+        """Write recorded entries to the fixture file"""
+        entries = [entry for recorded in self.entries.values() for entry in recorded]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'recorded_at': time.time(), 'entries': entries}, f)
+        print(f"💾 Saved {len(entries)} responses to {self.path}")
+
+# ================================
+# PATCHING
+# ================================
+
+def _patched_send(adapter, request, **kwargs):
+    session = _active
+    if session is None:
+        return _original_send(adapter, request, **kwargs)
+    return session.send(adapter, request, **kwargs)
+
+def start(path, mode='replay', latency='recorded', host_latency=None):
+    """Route all HTTP traffic through a new record/replay session"""
+    global _active
+    session = Session(path, mode, latency, host_latency)
+    with _lock:
+        _active = session
+        HTTPAdapter.send = _patched_send
+    return session
+
+def stop():
+    """Restore normal HTTP and save the session if it was recording"""
+    global _active
+    with _lock:
+        session, _active = _active, None
+        HTTPAdapter.send = _original_send
+    if session is not None and session.mode == 'record':
+        session.save()
+    return session
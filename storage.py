@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import threading
+
+# ================================
+# CONFIGURATION
+# ================================
+
+# Directory holding everything the bots persist between runs.
+# GitHub Actions restores it with actions/cache before each run.
+CACHE_DIR = os.environ.get(
+    'BOT_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+)
+
+_local = threading.local()
+
+# Bumped by set_cache_dir so every thread reopens its databases there
+_generation = 0
+
+# ================================
+# HELPERS
+# ================================
+
+def cache_path(*parts):
+    """Path inside the cache directory, creating parent folders as needed"""
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def set_cache_dir(path):
+    """Point all later cache reads and writes at `path`"""
+    global CACHE_DIR, _generation
+    CACHE_DIR = path
+    _generation += 1
+
+def connect(name, schema=''):
+    """
+    SQLite connection to a database in the cache directory, one per thread.
+    WAL mode lets readers and a writer work at the same time. `schema` is
+    run once when the thread first opens the database.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None or _local.generation != _generation:
+        for stale in (connections or {}).values():
+            stale.close()
+        connections = _local.connections = {}
+        _local.generation = _generation
+
+    conn = connections.get(name)
+    if conn is None:
+        conn = sqlite3.connect(cache_path(name), timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if schema:
+            conn.executescript(schema)
+        connections[name] = conn
+    return conn
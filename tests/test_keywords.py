@@ -0,0 +1,23 @@
+from keywords import KeywordMatcher
+
+
+def test_findall_overlapping_prefixes():
+    matcher = KeywordMatcher(['sponsor', 'sponsored', 'spam', 'sp'])
+    assert matcher.findall('Sponsored post') == {'sp', 'sponsor', 'sponsored'}
+
+
+def test_findall_whole_words():
+    matcher = KeywordMatcher(['ai', 'ai model'], whole_words=True)
+    assert matcher.findall('New AI model from said lab') == {'ai', 'ai model'}
+    assert matcher.findall('said') == set()
+
+
+def test_non_ascii_case_folding():
+    # IGNORECASE matches 'ſ' as 's' and 'İ' as 'i'; both map back to the listed keyword
+    matcher = KeywordMatcher(['sponsor', 'spam', 'sp'])
+    assert matcher.findall('ſponsor') == {'sponsor', 'sp'}
+    assert matcher.search('ſpam') == 'spam'
+
+    matcher = KeywordMatcher(['bitcoin'])
+    assert matcher.findall('BİTCOİN news') == {'bitcoin'}
+    assert matcher.search('BİTCOİN news') == 'bitcoin'
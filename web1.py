@@ -1,11 +1,17 @@
 import os
-import requests
 import random
 import time
-import feedparser
-from datetime import datetime
 import re
-import tweepy
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import history
+import llm
+import publisher
+from articles import Article, feed_source
+from dedupe import dedupe_articles
+from feeds import fetch_feeds
+from keywords import KeywordMatcher
 
 # ================================
 # CONFIGURATION
@@ -17,6 +23,11 @@ TWITTER_API_SECRET = os.environ.get('TWITTER_API_SECRET')
 TWITTER_ACCESS_TOKEN = os.environ.get('TWITTER_ACCESS_TOKEN')
 TWITTER_ACCESS_TOKEN_SECRET = os.environ.get('TWITTER_ACCESS_TOKEN_SECRET')
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+GEMINI_MODEL = 'gemini-2.0-flash'
+
+# Candidate posts generated in one request and audited in parallel; the first
+# approved one is posted
+CANDIDATE_COUNT = int(os.environ.get('CANDIDATE_COUNT', '3'))
 
 # ================================
 # RSS FEEDS - Web3, Tech, and General Web
@@ -72,85 +83,97 @@ RSS_FEEDS = [
 # CONTENT FILTERING
 # ================================
 
+# Clear spam/promotions, checked against titles
+SPAM_PHRASES = [
+    'buy now', 'limited time offer', 'discount code', 'coupon code',
+    'airdrop live', 'whitelist open', 'presale starting', 'ico launch',
+    'investment opportunity', 'earn passive', 'double your',
+    '100x potential', 'get rich quick', 'sign up bonus',
+    'gambling', 'casino', 'betting', 'adult content'
+]
+
+# Category keywords used to pick the post style
+CATEGORY_KEYWORDS = {
+    'web3_security': [
+        'hack', 'exploit', 'vulnerability', 'breach', 'drain', 'stolen',
+        'attack', 'reentrancy', 'flash loan', 'audit finding', 'critical bug',
+        'rug pull', 'phishing', 'security flaw', 'risk', 'threat', 'mitigation'
+    ],
+    'web3_general': [
+        'web3', 'blockchain', 'crypto', 'defi', 'nft', 'dao', 'dapp',
+        'ethereum', 'bitcoin', 'solana', 'token', 'protocol', 'layer 2',
+        'zk', 'zero knowledge', 'rollup', 'validator', 'staking'
+    ],
+    'tech_ai': [
+        'ai', 'artificial intelligence', 'machine learning', 'llm',
+        'gpt', 'anthropic', 'openai', 'deep learning', 'neural network',
+        'model', 'training', 'inference', 'prompt engineering'
+    ],
+    'tech_development': [
+        'code', 'programming', 'software', 'developer', 'github', 'git',
+        'api', 'framework', 'library', 'tool', 'vs code', 'jetbrains',
+        'docker', 'kubernetes', 'cloud', 'aws', 'azure', 'gcp'
+    ],
+    'tech_news': [
+        'tech', 'technology', 'startup', 'funding', 'raise', 'series',
+        'acquisition', 'merge', 'ipo', 'market', 'industry', 'trend'
+    ]
+}
+
+# Keyword lists compiled once for filtering and categorization
+SPAM_MATCHER = KeywordMatcher(SPAM_PHRASES)
+CATEGORY_MATCHER = KeywordMatcher(
+    keyword for keywords in CATEGORY_KEYWORDS.values() for keyword in keywords
+)
+
 def is_spam_or_irrelevant(article):
     """
     Filter out spam, promotions, and completely irrelevant content.
     Returns True if article should be filtered out.
     """
-    title = article.get('title', '').lower()
-    
-    # Hard filters - clear spam/promotions
-    spam_phrases = [
-        'buy now', 'limited time offer', 'discount code', 'coupon code',
-        'airdrop live', 'whitelist open', 'presale starting', 'ico launch',
-        'investment opportunity', 'earn passive', 'double your',
-        '100x potential', 'get rich quick', 'sign up bonus',
-        'gambling', 'casino', 'betting', 'adult content'
-    ]
-    
-    for phrase in spam_phrases:
-        if phrase in title:
-            return True
-    
-    return False
+    return SPAM_MATCHER.search(article.title_lower) is not None
 
-def is_recent(article_date):
+def is_recent(article):
     """Check if article is recent (within 3 days)"""
-    if not article_date:
-        return False
-    return (datetime.now() - article_date).days <= 3
+    age = article.age()
+    return age is not None and age < 4 * 86400
 
 # ================================
 # CONTENT GENERATION
 # ================================
 
+def extract_image(entry):
+    """First image URL in a feed entry's media or links"""
+    if hasattr(entry, 'media_content') and entry.media_content:
+        for media in entry.media_content:
+            if 'url' in media and media.get('type', '').startswith('image'):
+                return media['url']
+    
+    # Try other image sources
+    if hasattr(entry, 'links'):
+        for link in entry.links:
+            if hasattr(link, 'type') and link.type and 'image' in link.type:
+                return link.href
+    return None
+
 def fetch_articles():
     """Fetch and filter articles from all RSS feeds"""
     all_articles = []
     
     print(f"📡 Checking {len(RSS_FEEDS)} RSS feeds...")
     
-    for rss_url in RSS_FEEDS:
+    for rss_url, feed in fetch_feeds(RSS_FEEDS):
         try:
-            feed = feedparser.parse(rss_url)
-            
             if not feed.entries:
                 continue
                 
             for entry in feed.entries[:5]:  # Check latest 5 entries
-                # Parse date
-                article_date = None
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    article_date = datetime(*entry.published_parsed[:6])
+                article = Article.from_entry(entry, source=feed_source(feed, rss_url, rss_url), image_finder=extract_image)
                 
                 # Check recency
-                if not is_recent(article_date):
+                if not is_recent(article):
                     continue
                 
-                # Extract image
-                image_url = None
-                if hasattr(entry, 'media_content') and entry.media_content:
-                    for media in entry.media_content:
-                        if 'url' in media and media.get('type', '').startswith('image'):
-                            image_url = media['url']
-                            break
-                
-                # Try other image sources
-                if not image_url and hasattr(entry, 'links'):
-                    for link in entry.links:
-                        if hasattr(link, 'type') and link.type and 'image' in link.type:
-                            image_url = link.href
-                            break
-                
-                article = {
-                    'title': entry.title,
-                    'link': entry.link,
-                    'summary': entry.summary if hasattr(entry, 'summary') else '',
-                    'published': article_date,
-                    'source': feed.feed.get('title', rss_url),
-                    'image_url': image_url
-                }
-                
                 # Apply filters
                 if not is_spam_or_irrelevant(article):
                     all_articles.append(article)
@@ -158,6 +181,15 @@ def fetch_articles():
         except Exception as e:
             continue  # Silently skip failed feeds
     
+    # The same story often comes from several feeds, keep one article per story
+    article_count = len(all_articles)
+    all_articles = dedupe_articles(all_articles)
+    print(f"🧹 {article_count} articles cover {len(all_articles)} distinct stories")
+    
+    # Skip stories we've already posted about, whichever outlet we used
+    posted = history.posted_urls(link for article in all_articles for link in article.links)
+    all_articles = [article for article in all_articles if not any(link in posted for link in article.links)]
+    
     print(f"✅ Found {len(all_articles)} recent articles")
     return all_articles
 
@@ -165,44 +197,13 @@ def categorize_article(article):
     """
     Determine the category of the article for appropriate content generation
     """
-    title = article['title'].lower()
-    summary = article.get('summary', '').lower()
-    content = title + " " + summary
-    
-    # Define category keywords
-    categories = {
-        'web3_security': [
-            'hack', 'exploit', 'vulnerability', 'breach', 'drain', 'stolen',
-            'attack', 'reentrancy', 'flash loan', 'audit finding', 'critical bug',
-            'rug pull', 'phishing', 'security flaw', 'risk', 'threat', 'mitigation'
-        ],
-        'web3_general': [
-            'web3', 'blockchain', 'crypto', 'defi', 'nft', 'dao', 'dapp',
-            'ethereum', 'bitcoin', 'solana', 'token', 'protocol', 'layer 2',
-            'zk', 'zero knowledge', 'rollup', 'validator', 'staking'
-        ],
-        'tech_ai': [
-            'ai', 'artificial intelligence', 'machine learning', 'llm',
-            'gpt', 'anthropic', 'openai', 'deep learning', 'neural network',
-            'model', 'training', 'inference', 'prompt engineering'
-        ],
-        'tech_development': [
-            'code', 'programming', 'software', 'developer', 'github', 'git',
-            'api', 'framework', 'library', 'tool', 'vs code', 'jetbrains',
-            'docker', 'kubernetes', 'cloud', 'aws', 'azure', 'gcp'
-        ],
-        'tech_news': [
-            'tech', 'technology', 'startup', 'funding', 'raise', 'series',
-            'acquisition', 'merge', 'ipo', 'market', 'industry', 'trend'
-        ]
+    # Score each category by how many of its keywords appear
+    found = CATEGORY_MATCHER.findall(article.title_lower + " " + article.summary_lower)
+    category_scores = {
+        category: sum(1 for keyword in keywords if keyword in found)
+        for category, keywords in CATEGORY_KEYWORDS.items()
     }
     
-    # Score each category
-    category_scores = {}
-    for category, keywords in categories.items():
-        score = sum(1 for keyword in keywords if keyword in content)
-        category_scores[category] = score
-    
     # Return the highest scoring category
     best_category = max(category_scores, key=category_scores.get)
     return best_category if category_scores[best_category] > 0 else 'tech_news'
@@ -211,8 +212,8 @@ def generate_content_prompt(article, category):
     """
     Generate appropriate prompt based on article category
     """
-    title = article['title']
-    summary = article['summary'][:500]
+    title = article.title
+    summary = article.summary[:500]
     
     base_prompt = f"""
     Create a Twitter post about this topic: {title}
@@ -260,42 +261,46 @@ def generate_content_prompt(article, category):
     
     return base_prompt + prompt_addition
 
-def generate_structured_post(article):
+def generate_structured_posts(article, category=None, count=1):
     """
-    Generate a post based on article category
+    Generate `count` candidate posts based on article category in one
+    request. Returns (post_texts, category).
     """
     # Determine category first
-    category = categorize_article(article)
-    print(f"📊 Article category: {category.replace('_', ' ').title()}")
+    if category is None:
+        category = categorize_article(article)
+        print(f"📊 Article category: {category.replace('_', ' ').title()}")
     
     # Generate appropriate prompt
     prompt = generate_content_prompt(article, category)
     
     try:
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
+        response = llm.request(
+            {
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": {"candidateCount": count}
+            },
+            model=GEMINI_MODEL,
             timeout=30
         )
         
         if response.status_code == 200:
-            data = response.json()
-            if "candidates" in data and data["candidates"]:
-                post_text = data["candidates"][0]["content"]["parts"][0]["text"].strip()
+            post_texts = []
+            for post_text in llm.texts_of(response.json()):
                 post_text = post_text.replace('```', '').strip()
                 
                 # Clean up any AI artifacts
                 post_text = re.sub(r'\b(as an ai|according to|language model)\b', '', post_text, flags=re.IGNORECASE)
                 post_text = ' '.join(post_text.split())  # Normalize whitespace
-                
-                return post_text, category
+                if post_text:
+                    post_texts.append(post_text)
+            
+            return post_texts, category
                 
     except Exception as e:
         print(f"⚠️ Content generation failed: {e}")
     
-    return None, category
+    return [], category
 
 def generate_relevant_hashtags(post_text, category):
     """Generate context-relevant hashtags based on category and content"""
@@ -320,28 +325,14 @@ def generate_relevant_hashtags(post_text, category):
     - Tech development: #Programming #Developer #Tech #Tools
     """
     
-    try:
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
-            timeout=20
-        )
+    hashtags = llm.generate(prompt, model=GEMINI_MODEL, timeout=20, cache='hashtags')
+    if hashtags:
+        hashtags = hashtags.replace('```', '').strip()
         
-        if response.status_code == 200:
-            data = response.json()
-            if "candidates" in data and data["candidates"]:
-                hashtags = data["candidates"][0]["content"]["parts"][0]["text"].strip()
-                hashtags = hashtags.replace('```', '').strip()
-                
-                # Validate hashtags
-                hashtag_list = [h for h in hashtags.split() if h.startswith('#') and len(h) > 1]
-                if len(hashtag_list) >= 2:
-                    return ' '.join(hashtag_list[:5])
-                    
-    except Exception:
-        pass
+        # Validate hashtags
+        hashtag_list = [h for h in hashtags.split() if h.startswith('#') and len(h) > 1]
+        if len(hashtag_list) >= 2:
+            return ' '.join(hashtag_list[:5])
     
     # Fallback hashtags by category
     fallback_hashtags = {
@@ -367,7 +358,7 @@ def audit_post_quality(article, post_text, category):
     CRITICAL REVIEW: Evaluate this Twitter post.
     
     CATEGORY: {category.replace('_', ' ')}
-    ORIGINAL ARTICLE TITLE: {article['title']}
+    ORIGINAL ARTICLE TITLE: {article.title}
     
     GENERATED POST: {post_text}
     
@@ -391,11 +382,9 @@ def audit_post_quality(article, post_text, category):
     """
     
     try:
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
+        response = llm.request(
+            {"contents": [{"parts": [{"text": prompt}]}]},
+            model=GEMINI_MODEL,
             timeout=30
         )
         
@@ -415,69 +404,60 @@ def audit_post_quality(article, post_text, category):
     # Default to rejection if check fails
     return False, "Quality check system error"
 
+def audit_candidate(article, post_text, category, cancelled):
+    """
+    Audit one candidate post unless another one already won.
+    Returns (post_text, is_approved, feedback).
+    """
+    # Another candidate already won, skip the audit call
+    if cancelled.is_set():
+        return post_text, False, "Cancelled"
+    
+    is_approved, feedback = audit_post_quality(article, post_text, category)
+    if not is_approved:
+        print(f"❌ Candidate rejected: {feedback}")
+        print(f"   {post_text}")
+    return post_text, is_approved, feedback
+
+def generate_approved_post(article, count=None):
+    """
+    Generate candidate posts in one request, audit them concurrently and
+    return (post_text, category, feedback) for the first approved
+    candidate. post_text is None when no candidate is approved.
+    """
+    count = count or CANDIDATE_COUNT
+    category = categorize_article(article)
+    print(f"📊 Article category: {category.replace('_', ' ').title()}")
+    
+    post_texts, _ = generate_structured_posts(article, category, count)
+    if not post_texts:
+        return None, category, "Failed to generate post content"
+    
+    cancelled = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(post_texts))
+    futures = [executor.submit(audit_candidate, article, text, category, cancelled) for text in post_texts]
+    feedback = "No candidates generated"
+    try:
+        for future in as_completed(futures):
+            post_text, is_approved, feedback = future.result()
+            if is_approved:
+                return post_text, category, feedback
+    finally:
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return None, category, feedback
+
 # ================================
 # TWITTER POSTING
 # ================================
 
-def post_to_twitter(content, image_url=None):
-    """Post content to Twitter/X"""
-    try:
-        # Ensure content length
-        if len(content) > 280:
-            content = content[:277] + "..."
-        
-        media_ids = []
-        
-        # Handle image if provided
-        if image_url:
-            try:
-                # Clean URL
-                clean_url = image_url.split('?')[0].split('&#')[0]
-                
-                # Download image
-                response = requests.get(clean_url, timeout=30)
-                if response.status_code == 200:
-                    # Save temp file
-                    temp_file = "/tmp/tweet_image.jpg"
-                    with open(temp_file, "wb") as f:
-                        f.write(response.content)
-                    
-                    # Upload to Twitter
-                    auth_v1 = tweepy.OAuthHandler(TWITTER_API_KEY, TWITTER_API_SECRET)
-                    auth_v1.set_access_token(TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET)
-                    api_v1 = tweepy.API(auth_v1)
-                    
-                    media = api_v1.media_upload(filename=temp_file)
-                    media_ids.append(media.media_id_string)
-                    
-                    # Clean up
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
-                        
-            except Exception:
-                pass  # Continue without image
-        
-        # Post tweet
-        client_v2 = tweepy.Client(
-            consumer_key=TWITTER_API_KEY,
-            consumer_secret=TWITTER_API_SECRET,
-            access_token=TWITTER_ACCESS_TOKEN,
-            access_token_secret=TWITTER_ACCESS_TOKEN_SECRET
-        )
-        
-        if media_ids:
-            response = client_v2.create_tweet(text=content, media_ids=media_ids)
-        else:
-            response = client_v2.create_tweet(text=content)
-        
-        if response and response.data:
-            print(f"✅ Tweet posted successfully!")
-            return True
-            
-    except Exception as e:
-        print(f"❌ Twitter posting failed: {e}")
-    
-    return False
+def post_to_twitter(content, image_url=None, source_url=None):
+    """Queue content in the outbox and post it to Twitter/X"""
+    # Clean up URL
+    if image_url:
+        image_url = image_url.split('?')[0].split('&#')[0]
+    return publisher.post('web1', content, url=source_url, image_urls=[image_url])
 
 # ================================
 # MAIN EXECUTION FLOW
@@ -504,6 +484,16 @@ def main():
         print("❌ Missing Twitter API credentials")
         return
     
+    # Stop before fetching feeds or calling Gemini when the account's
+    # tweet quota is used up
+    if not publisher.can_post():
+        return
+    
+    # A post an earlier run queued but couldn't publish goes out before
+    # anything new is generated
+    if publisher.resume('web1'):
+        return
+    
     # Step 1: Fetch articles
     articles = fetch_articles()
     
@@ -513,33 +503,24 @@ def main():
     
     # Step 2: Select random article
     article = random.choice(articles)
-    print(f"\n📰 Selected article: {article['title'][:80]}...")
-    print(f"📅 Published: {article['published'].strftime('%Y-%m-%d') if article['published'] else 'Unknown'}")
+    print(f"\n📰 Selected article: {article.title[:80]}...")
+    print(f"📅 Published: {article.published_date()}")
     
-    # Step 3: Generate structured post
-    print("\n🤖 Generating structured post...")
-    post_text, category = generate_structured_post(article)
+    # Step 3: Generate structured posts and run the AI quality audit on each
+    print(f"\n🤖 Generating {CANDIDATE_COUNT} structured post candidates with AI quality audit...")
+    post_text, category, feedback = generate_approved_post(article)
     
     if not post_text:
-        print("❌ Failed to generate post content")
+        print(f"❌ POST REJECTED: {feedback}")
         return
     
+    print(f"✅ QUALITY CHECK PASSED: {feedback}")
+    
     # Step 4: Generate hashtags
     hashtags = generate_relevant_hashtags(post_text, category)
     full_post = f"{post_text} {hashtags}"
     
-    # Step 5: AI quality check
-    print("\n🔍 Running AI quality audit...")
-    is_approved, feedback = audit_post_quality(article, post_text, category)
-    
-    if not is_approved:
-        print(f"❌ POST REJECTED: {feedback}")
-        print(f"\nGenerated post was:\n{post_text}")
-        return
-    
-    print(f"✅ QUALITY CHECK PASSED: {feedback}")
-    
-    # Step 6: Final length check
+    # Step 5: Final length check
     if len(full_post) > 280:
         # Trim main content, preserve hashtags
         hashtag_part = ' ' + hashtags
@@ -550,7 +531,7 @@ def main():
         else:
             full_post = full_post[:277] + "..."
     
-    # Step 7: Preview and confirm
+    # Step 6: Preview and confirm
     print("\n" + "=" * 60)
     print("📝 FINAL POST PREVIEW:")
     print("=" * 60)
@@ -560,9 +541,9 @@ def main():
     print(f"Category: {category.replace('_', ' ').title()}")
     print(f"Hashtags: {len([h for h in full_post.split() if h.startswith('#')])}")
     
-    # Step 8: Post to Twitter
+    # Step 7: Post to Twitter
     print("\n🚀 Posting to Twitter...")
-    success = post_to_twitter(full_post, article.get('image_url'))
+    success = post_to_twitter(full_post, article.image_url, article.link)
     
     if success:
         print("🎉 Content successfully published!")